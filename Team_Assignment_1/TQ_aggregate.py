@@ -0,0 +1,136 @@
+'''
+Map-reduce aggregation of many session files into one count model.
+
+Scans a directory for session files, i.e. round logs (*.rpslog, see TQ_game_log) and [human_move, computer_move]
+histories (*.npy, like data.npy), and merges them into a single model file in the checkpoint format (see
+TQ_checkpoint.save_model_file) that load_model_file() reads back.
+
+    map     - every file is reduced to its 3x3x3 V-DAG transition counts N(prev_hm, prev_cm, cur_cm), streaming the file
+              in chunks (see TQ_stream). Files are mapped in a process pool.
+    reduce  - the counts of all files are summed. The Inv(V-DAG) counts are marginals of the same tensor:
+              N(Y) = sum over (h, c), N(Y, human) = sum over c, N(Y, computer) = sum over h.
+
+A manifest next to the sessions keeps the size, mtime, SHA-1 and counts of every file already mapped. A file whose
+size and mtime are unchanged is not read again, and one that was only touched (new mtime, same size and hash) is not
+mapped again, so a nightly rebuild only maps new or modified sessions. Files that disappeared drop out of the merge.
+
+Example:
+    python TQ_aggregate.py sessions/ --output merged_model.npz
+'''
+
+# Import required libraries
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from TQ_game_log import open_log
+from TQ_stream import iter_history_chunks, iter_triples, iter_log_triples, stream_fit
+from TQ_bayes_net import VDAGModel
+from TQ_inv_bayes_net import InvVDAGModel
+from TQ_checkpoint import file_digest, save_model_file
+
+SESSION_EXTENSIONS = ('.rpslog', '.npy')
+MANIFEST_NAME = "aggregate_manifest.json"
+
+def session_files(directory):
+    '''
+    returns the paths of the session files in a directory (and its subdirectories), sorted
+    '''
+    paths = []
+    for root, _, names in os.walk(directory):
+        paths.extend(os.path.join(root, name) for name in names if name.endswith(SESSION_EXTENSIONS))
+    return sorted(paths)
+
+def file_counts(path):
+    '''
+    Map step: returns the V-DAG counts of one session file
+    '''
+    if path.endswith('.rpslog'):
+        chunks = iter_log_triples(open_log(path))
+    else:
+        chunks = iter_triples(iter_history_chunks(path))
+    return stream_fit(VDAGModel(), chunks).counts
+
+def map_file(path):
+    '''
+    returns the manifest entry of a file: its size, mtime, SHA-1 and counts
+    '''
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': file_digest(path),
+            'counts': file_counts(path).ravel().tolist()}
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(path, manifest):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(path + '.tmp', path)
+
+def merged_models(counts):
+    '''
+    Reduce step result: returns the (V-DAG, Inv(V-DAG)) pair for summed V-DAG counts
+    '''
+    v_model, inv_model = VDAGModel(), InvVDAGModel()
+    v_model.counts[...] = counts
+    inv_model.label_counts[...] = counts.sum(axis=(0, 1))
+    inv_model.human_counts[...] = counts.sum(axis=1).T
+    inv_model.computer_counts[...] = counts.sum(axis=0).T
+    v_model._invalidate()
+    inv_model._invalidate()
+    return v_model, inv_model
+
+def aggregate(directory, output, manifest_path=None, max_workers=None):
+    '''
+    Brings the manifest of a directory up to date, writes the merged model file and returns a short report
+    '''
+    manifest_path = manifest_path or os.path.join(directory, MANIFEST_NAME)
+    old_manifest = load_manifest(manifest_path)
+    manifest = {}
+    to_map = []
+    rehashed = 0
+    for path in session_files(directory):
+        key = os.path.relpath(path, directory)
+        entry = old_manifest.get(key)
+        stat = os.stat(path)
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            manifest[key] = entry
+        elif entry is not None and entry['size'] == stat.st_size and entry['sha1'] == file_digest(path):
+            manifest[key] = dict(entry, mtime_ns=stat.st_mtime_ns) # touched but not modified
+            rehashed += 1
+        else:
+            to_map.append((key, path))
+
+    if to_map:
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+            chunksize = max(1, len(to_map) // (4 * (max_workers or os.cpu_count())))
+            for (key, _), entry in zip(to_map, pool.map(map_file, [path for _, path in to_map], chunksize=chunksize)):
+                manifest[key] = entry
+
+    counts = np.zeros(27, dtype=np.int64)
+    for entry in manifest.values():
+        counts += np.asarray(entry['counts'], dtype=np.int64)
+    v_model, inv_model = merged_models(counts.reshape(3, 3, 3))
+    save_model_file(output, v_model, inv_model, files=len(manifest))
+    save_manifest(manifest_path, manifest)
+    return {'files': len(manifest), 'mapped': len(to_map), 'unchanged': len(manifest) - len(to_map) - rehashed,
+            'rehashed': rehashed, 'removed': len(set(old_manifest) - set(manifest)), 'rows': int(counts.sum())}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Merge a directory of session logs into one count model")
+    parser.add_argument('directory')
+    parser.add_argument('--output', default="merged_model.npz")
+    parser.add_argument('--manifest', default=None, help="defaults to {} in the directory".format(MANIFEST_NAME))
+    parser.add_argument('--workers', type=int, default=None, help="defaults to all cores")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = aggregate(args.directory, args.output, args.manifest, args.workers)
+    print("{files} files ({mapped} mapped, {unchanged} unchanged, {rehashed} touched but unchanged, {removed} removed), "
+          "{rows} rows".format(**report))
+    print("Merged model written to {} in {:.2f}s".format(args.output, time.perf_counter() - start))
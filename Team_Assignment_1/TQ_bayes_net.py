@@ -12,20 +12,41 @@ Based on the priors, the prediction (next move) node is updated using the approp
 
 # Import required libraries
 import numpy as np
-from pomegranate import *
+from TQ_moves import MOVES, decode_move, decode_moves
+from TQ_posterior_table import PosteriorTableModel, normalize, make_prediction, log_prediction
+from TQ_discrete_bn import v_dag
 
 '''
 Uncomment this section if you would like to fit your Bayesian Network (V-DAG) using previously collected data
 '''
 # ****************Change .npy Name when necessary*********************
-# training_data = np.load("training_data.npy", allow_pickle=True) ## Load historical data
-# training_data = np.concatenate((training_data[:-1, :], training_data[1:,1].reshape(-1,1)), axis=1) ## Re-arrange the array such that column 1 contains previous human moves, column 2 contains previous computer moves and column 3 contains the next computer moves
+# training_data = load_history("training_data.npy") ## Load historical data as uint8 move codes (see TQ_moves)
+# training_data = to_triples(training_data) ## Re-arrange the array such that column 1 contains previous human moves, column 2 contains previous computer moves and column 3 contains the next computer moves
 '''
 Uncomment this section if you would like to fit your Bayesian Network (V-DAG) known priors or any other pmf values you see fit, else comment
 it if you plan to fit it using previously collected data. Please note that either this section or the one above needs to be active during anytime!
 '''
 
-def v_predict_move(human_move, computer_move, training_data): # previous moves
+def v_predict_move(human_move, computer_move, training_data, backend='numpy'): # previous moves
+    '''
+    returns the most likely next computer move. The V-DAG is fitted and queried with the NumPy engine in TQ_discrete_bn,
+    or with the legacy pomegranate network below if backend='pomegranate'
+    '''
+    if backend == 'pomegranate':
+        return pomegranate_v_predict_move(human_move, computer_move, training_data)
+    net = v_dag().fit(training_data)
+    prediction = make_prediction(net.posterior('prediction', {'human': int(human_move), 'computer': int(computer_move)}))
+    log_prediction(prediction, "prediction")
+    return prediction.predicted
+
+def pomegranate_v_predict_move(human_move, computer_move, training_data): # previous moves
+    # pomegranate is slow to import, so it is only loaded once the legacy network is actually used
+    from pomegranate import BayesianNetwork, ConditionalProbabilityTable, DiscreteDistribution, State
+
+    # The pomegranate CPTs below are keyed by move names, so decode the move codes at this boundary
+    human_move, computer_move = decode_move(human_move), decode_move(computer_move)
+    training_data = decode_moves(training_data)
+
     # Assume human samples from a categorical distribution comprising of 3 outcomes, each of which are equally likely 
     human = DiscreteDistribution({'rock': 1./3, 'paper': 1./3, 'scissors': 1./3}) # P(A)
 
@@ -86,26 +107,83 @@ def v_predict_move(human_move, computer_move, training_data): # previous moves
     # Uncomment only if you want to directly fit your Bayesian Network using data. 
     model.fit(training_data) # will update human, computer and CPT
     
-    # The following line returns the action that maximizes P(prediction|human_move,computer_move)
-    prediction = model.predict([[human_move, computer_move, None]]) # <<------------------ takes in previous hm, cm
-    
-    print ("Argmax_Prediction:{}".format(prediction[-1][-1]))
-    
-    output = prediction[-1][-1]
-    
-    # To generate predictions probabilities for each of the possible actions, provide as evidence "Human": "Rock" and "Computer":     # "Paper" to your model
+    # A single inference pass: the posterior of the last node given "Human" and "Computer" as evidence. Its argmax is the
+    # action that maximizes P(prediction|human_move,computer_move), so model.predict is not needed on top of it
     predictions = model.predict_proba({"human": human_move, "computer": computer_move}) # <<------------------ takes in previous hm, cm
-        
-        # Print prediction probabilities for each node
-    for node, prediction in zip(model.states, predictions):
-        if isinstance(prediction, str):
-            print(f"{node.name}: {prediction}") ## Prints the current state (previous moves) of the Human and Computer Nodes in your Bayesian Network
-        else:
-            print(f"{node.name}")
-            for value, probability in prediction.parameters[0].items():
-                print(f"    {value}: {probability:.4f}")  ## Prints the probability for each possible action given the current state of the parents in your Bayesian Network
-    
-    return output
+    posterior = predictions[-1].parameters[0]
+    prediction = make_prediction(np.array([posterior[move] for move in MOVES]))
+
+    # Prints the posterior and the recommendation if the 'rps.prediction' logger is enabled (see TQ_posterior_table)
+    log_prediction(prediction, "prediction")
+
+    return prediction.predicted
+
+def v_posterior_table(counts):
+    '''
+    returns table[..., h, c, y] = P(prediction=y | human=h, computer=c) from V-DAG counts of shape (..., 3, 3, 3).
+    A (human, computer) pair that has never been observed falls back to a uniform distribution
+    '''
+    return normalize(counts)
+
+class VDAGModel(PosteriorTableModel):
+    '''
+    Persistent V-DAG that keeps the sufficient statistics of P(prediction | human, computer) instead of refitting a
+    pomegranate network every round. counts[h, c, y] is the number of rows [h, c, y] seen so far, so appending a row
+    is a single increment and the CPT is just the counts normalised over the last axis.
+    All moves are the integer codes from TQ_moves.
+    '''
+
+    count_dtype = np.int64
+
+    def __init__(self, training_data=None):
+        self.counts = np.zeros((3, 3, 3), dtype=self.count_dtype)
+        if training_data is not None:
+            self.fit(training_data)
+
+    def fit(self, training_data):
+        '''
+        Rebuild the counts from scratch using rows of [prev_hm, prev_cm, cur_cm]
+        '''
+        self._fit_rows(np.asarray(training_data, dtype=np.intp).reshape(-1, 3))
+        self._invalidate()
+        return self
+
+    def update(self, sample):
+        '''
+        Add a single [prev_hm, prev_cm, cur_cm] row in O(1)
+        '''
+        h, c, y = (int(move) for move in sample)
+        self._add(h, c, y, 1)
+        self._invalidate()
+
+    def _row_counts(self, rows, weights=None):
+        packed = (rows[:, 0] * 3 + rows[:, 1]) * 3 + rows[:, 2]
+        return [np.bincount(packed, weights=weights, minlength=27).reshape(3, 3, 3)]
+
+    def _fit_rows(self, rows, weights=None):
+        self.counts[:] = self._row_counts(rows, weights)[0]
+
+    def _add(self, h, c, y, weight):
+        self.counts[h, c, y] += weight
+
+    def _count_arrays(self):
+        return [self.counts]
+
+    def _compute_table(self):
+        return v_posterior_table(self.counts)
+
+def v_predict_moves(human_moves, computer_moves, training_data):
+    '''
+    Batch counterpart of v_predict_move: fits the V-DAG once and returns the most likely next move for every pair of
+    previous moves
+    '''
+    return VDAGModel(training_data).predict_batch(human_moves, computer_moves)
+
+def v_posterior_matrix(training_data):
+    '''
+    returns the 9x3 matrix of V-DAG posteriors for every (human_move, computer_move) pair from a single fit
+    '''
+    return VDAGModel(training_data).posterior_matrix()
 
 # predict_move('NA','NA')                
 
@@ -0,0 +1,152 @@
+'''
+Benchmark suite for per-round prediction latency versus history size.
+
+For synthetic histories of increasing size it times, for every model:
+    fit            - building the model from the whole history
+    predict        - most likely next computer move for one (human_move, computer_move) pair
+    predict_proba  - posterior over the next computer move for one pair
+    infer          - the Prediction (posterior, predicted move, recommended move, entropy) for one pair
+    feedback       - appending one [prev_hm, prev_cm, cur_cm] row to the history buffer and the model, followed by
+                     the next infer (which is what a round with real-time feedback costs)
+The legacy functions (v_predict_move / inv_predict_move, with the NumPy backend and, if installed, pomegranate) refit
+on every call, so they are timed as a single "round" operation and only up to --legacy-max-rows rows.
+
+Results are written as JSON so runs can be compared over time.
+
+Example:
+    python TQ_benchmark.py --sizes 100 1000 10000 100000 1000000 --output benchmark.json
+'''
+
+# Import required libraries
+import argparse
+import importlib.util
+import itertools
+import json
+import platform
+import statistics
+import sys
+import time
+import numpy as np
+from TQ_moves import MOVE_DTYPE, to_triples
+from TQ_history import HistoryBuffer
+from TQ_bayes_net import VDAGModel, v_predict_move
+from TQ_inv_bayes_net import InvVDAGModel, inv_predict_move
+from TQ_ngram import NGramModel
+
+MODELS = {'V-DAG': VDAGModel, 'Inv(V-DAG)': InvVDAGModel, 'N-gram': NGramModel}
+
+def synthetic_history(n_rows, rng):
+    '''
+    returns n_rows random [prev_hm, prev_cm, cur_cm] triples
+    '''
+    return to_triples(rng.integers(0, 3, size=(n_rows + 1, 2), dtype=MOVE_DTYPE))
+
+def time_call(fn, number, repeats):
+    '''
+    returns the median and the best time per call of fn over several repeats of number calls each
+    '''
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    return statistics.median(timings), min(timings)
+
+def calls_for(seconds_per_call, budget=0.05):
+    '''
+    returns how many calls fit in the time budget of a single repeat
+    '''
+    return max(1, min(100000, int(budget / max(seconds_per_call, 1e-9))))
+
+def bench_model(name, model_class, history, repeats, rng):
+    '''
+    returns benchmark records for one count model on one history
+    '''
+    records = []
+    evidence = [tuple(int(move) for move in row) for row in rng.integers(0, 3, size=(64, 2))]
+
+    def record(operation, fn):
+        # A single warm-up call also sizes the number of calls per repeat
+        start = time.perf_counter()
+        fn()
+        number = calls_for(time.perf_counter() - start)
+        median, best = time_call(fn, number, repeats)
+        records.append({'model': name, 'rows': len(history), 'operation': operation,
+                        'seconds_per_call': median, 'best_seconds_per_call': best, 'calls': number})
+
+    record('fit', lambda: model_class(history))
+
+    model = model_class(history)
+    queries = itertools.cycle(evidence)
+    record('predict', lambda: model.predict(*next(queries)))
+    record('predict_proba', lambda: model.predict_proba(*next(queries)))
+    record('infer', lambda: model.infer(*next(queries)))
+
+    buffer = HistoryBuffer(3, history)
+    samples = itertools.cycle(synthetic_history(4096, rng))
+    def feedback_round():
+        sample = next(samples)
+        buffer.append(sample)
+        model.update(sample)
+        model.infer(*next(queries))
+    record('feedback', feedback_round)
+    return records
+
+def bench_legacy(history, repeats):
+    '''
+    returns benchmark records for v_predict_move / inv_predict_move with the NumPy backend, and with the pomegranate
+    backend if pomegranate is installed
+    '''
+    backends = ['numpy']
+    if importlib.util.find_spec('pomegranate') is not None:
+        backends.append('pomegranate')
+    records = []
+    for backend in backends:
+        for name, fn in (('V-DAG ({})'.format(backend), v_predict_move), ('Inv(V-DAG) ({})'.format(backend), inv_predict_move)):
+            median, best = time_call(lambda: fn(0, 1, history, backend), 1, repeats)
+            records.append({'model': name, 'rows': len(history), 'operation': 'round',
+                            'seconds_per_call': median, 'best_seconds_per_call': best, 'calls': 1})
+    return records
+
+def run(sizes, repeats=5, seed=0, legacy_max_rows=10000):
+    '''
+    Runs the whole suite and returns a JSON-serialisable dict
+    '''
+    rng = np.random.default_rng(seed)
+    results = []
+    for n_rows in sizes:
+        history = synthetic_history(n_rows, rng)
+        for name, model_class in MODELS.items():
+            results.extend(bench_model(name, model_class, history, repeats, rng))
+        if n_rows <= legacy_max_rows:
+            results.extend(bench_legacy(history, repeats))
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'seed': seed,
+            'repeats': repeats,
+            'sizes': list(sizes),
+        },
+        'results': results,
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Per-round prediction latency versus history size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000, 1000000])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--legacy-max-rows', type=int, default=10000)
+    parser.add_argument('--output', default="benchmark.json")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.repeats, args.seed, args.legacy_max_rows)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for r in report['results']:
+        print("{:<26} {:>9} rows  {:<14} {:>12.2f} us".format(r['model'], r['rows'], r['operation'], r['seconds_per_call'] * 1e6))
+    print("Results written to {}".format(args.output))
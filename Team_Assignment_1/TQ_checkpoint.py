@@ -0,0 +1,155 @@
+'''
+Checkpoints of the fitted V-DAG and Inv(V-DAG) counts.
+
+The models are fitted on training_data.npy plus every game recorded in the round log (see TQ_game_log). Instead of
+re-deriving the counts from all of that at every start, a small .npz checkpoint keeps the count tensors together with
+the data version they were fitted on:
+    - a SHA-1 digest of training_data.npy
+    - the number of log records already counted, and the timestamp of the last one
+
+At startup the checkpoint is loaded (a few small arrays) and only the log records added since are replayed. If
+training_data.npy changed, or the log is not the one the checkpoint was made from, the counts are refitted from
+scratch, streaming both files in chunks (see TQ_stream). The checkpoint is brought up to date whenever a game is reset and when the program exits.
+'''
+
+# Import required libraries
+import hashlib
+import itertools
+import os
+import tempfile
+import numpy as np
+from TQ_game_log import LOG_PATH, open_log
+from TQ_stream import iter_history_chunks, iter_triples, iter_log_triples, iter_log_games
+from TQ_bayes_net import VDAGModel
+from TQ_inv_bayes_net import InvVDAGModel
+
+CHECKPOINT_PATH = "model_checkpoint.npz"
+CHECKPOINT_VERSION = 1
+
+def file_digest(path):
+    '''
+    returns the SHA-1 hex digest of a file (empty string if there is no such file)
+    '''
+    if not os.path.exists(path):
+        return ''
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def training_triples(training_data_path):
+    '''
+    Yields the triples of training_data.npy in chunks (nothing if there is no such file)
+    '''
+    if os.path.exists(training_data_path):
+        yield from iter_triples(iter_history_chunks(training_data_path))
+
+def history_triples(training_data_path="training_data.npy", log=None):
+    '''
+    Yields the triples of training_data.npy followed by those of the round log, in chunks
+    '''
+    return itertools.chain(training_triples(training_data_path), iter_log_triples(open_log() if log is None else log))
+
+def history_games(training_data_path="training_data.npy", log_path=LOG_PATH):
+    '''
+    Yields (new_game, triples) for training_data.npy, as one game, followed by every game of the round log.
+    For fit_games() (see TQ_stream)
+    '''
+    for i, triples in enumerate(training_triples(training_data_path)):
+        yield i == 0, triples
+    yield from iter_log_games(open_log(log_path))
+
+def save_model_file(path, v_model, inv_model, **metadata):
+    '''
+    Writes the counts of both models, plus any metadata arrays, to an .npz model file
+    '''
+    arrays = {'version': np.array(CHECKPOINT_VERSION)}
+    arrays.update((key, np.array(value)) for key, value in metadata.items())
+    for name, model in (('v', v_model), ('inv', inv_model)):
+        for i, counts in enumerate(model._count_arrays()):
+            arrays['{}_{}'.format(name, i)] = counts
+    # Write to a temporary file first so that a crash never leaves a truncated file behind. The name is unique so that
+    # two writers (the worker after a reset and the GUI thread at exit) never share a temporary file
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                    dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def _read_models(model_file):
+    # (v_model, inv_model) from the count arrays of an opened model file
+    v_model, inv_model = VDAGModel(), InvVDAGModel()
+    for name, model in (('v', v_model), ('inv', inv_model)):
+        for i, counts in enumerate(model._count_arrays()):
+            counts[...] = model_file['{}_{}'.format(name, i)]
+        model._invalidate()
+    return v_model, inv_model
+
+def load_model_file(path):
+    '''
+    returns the (V-DAG, Inv(V-DAG)) pair stored in a model file written by save_model_file
+    '''
+    with np.load(path) as model_file:
+        if int(model_file['version']) != CHECKPOINT_VERSION:
+            raise ValueError("{} has model file version {}, expected {}".format(path, int(model_file['version']),
+                                                                               CHECKPOINT_VERSION))
+        return _read_models(model_file)
+
+def save_checkpoint(v_model, inv_model, training_digest, log, path=CHECKPOINT_PATH):
+    '''
+    Writes the counts of both models and the data version they correspond to
+    '''
+    save_model_file(path, v_model, inv_model, training_digest=training_digest, log_rows=len(log),
+                    log_last_timestamp=log['timestamp'][-1] if len(log) else 0.)
+
+def _load_checkpoint(path, training_digest, log):
+    '''
+    returns (v_model, inv_model, log_rows) from the checkpoint, or None if it does not match the current data
+    '''
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as checkpoint:
+            if int(checkpoint['version']) != CHECKPOINT_VERSION or str(checkpoint['training_digest']) != training_digest:
+                return None
+            log_rows = int(checkpoint['log_rows'])
+            if log_rows > len(log) or (log_rows and log['timestamp'][log_rows - 1] != checkpoint['log_last_timestamp']):
+                return None
+            v_model, inv_model = _read_models(checkpoint)
+    except (OSError, KeyError, ValueError):
+        return None
+    return v_model, inv_model, log_rows
+
+def load_models(training_data_path="training_data.npy", log_path=LOG_PATH, checkpoint_path=CHECKPOINT_PATH):
+    '''
+    returns the V-DAG and Inv(V-DAG) fitted on training_data.npy plus the round log, starting from the checkpoint
+    when it is still valid and replaying only the log records added since
+    '''
+    training_digest = file_digest(training_data_path)
+    log = open_log(log_path)
+    loaded = _load_checkpoint(checkpoint_path, training_digest, log)
+    if loaded is None:
+        v_model, inv_model = VDAGModel(), InvVDAGModel()
+        chunks = history_triples(training_data_path, log)
+    else:
+        v_model, inv_model, log_rows = loaded
+        chunks = iter_log_triples(log, log_rows)
+    # Both models are fitted chunk by chunk, so memory stays flat however long the history is
+    for triples in chunks:
+        v_model.partial_fit(triples)
+        inv_model.partial_fit(triples)
+    return v_model, inv_model
+
+def update_checkpoint(training_data_path="training_data.npy", log_path=LOG_PATH, checkpoint_path=CHECKPOINT_PATH):
+    '''
+    Brings the checkpoint up to date with the round log and returns the models
+    '''
+    log = open_log(log_path)
+    v_model, inv_model = load_models(training_data_path, log_path, checkpoint_path)
+    save_checkpoint(v_model, inv_model, file_digest(training_data_path), log, checkpoint_path)
+    return v_model, inv_model
@@ -0,0 +1,109 @@
+'''
+A small, dependency-free engine for discrete Bayesian networks, used as the default backend of v_predict_move and
+inv_predict_move instead of the legacy pomegranate BayesianNetwork / State / bake API.
+
+Every node has a cardinality and a tuple of parents, and its CPT is a dense NumPy tensor indexed by
+(parent values..., value). Fitting is vectorized counting: the parent and node columns of every row are packed into a
+single index and counted with np.bincount. Parent configurations that never occur keep a uniform CPT row.
+
+Inference is exact: every CPT becomes a factor, the evidence nodes are sliced out of the factors and the remaining
+factors are contracted with a single np.einsum down to the query node, then normalised (uniform if the evidence has
+probability zero).
+
+    V-DAG       human -> prediction <- computer      v_dag()
+    Inv(V-DAG)  human <- Y -> computer               inv_v_dag()
+
+Example:
+    net = v_dag().fit(training_data)             # rows of [prev_hm, prev_cm, cur_cm]
+    net.posterior('prediction', {'human': ROCK, 'computer': PAPER})
+'''
+
+# Import required libraries
+import string
+import numpy as np
+
+class DiscreteBayesNet:
+    '''
+    Discrete Bayesian network over nodes with integer values 0..cardinality-1.
+    nodes lists (name, cardinality) in the order of the data columns; parents maps a node name to its parent names
+    '''
+
+    def __init__(self, nodes, parents=None):
+        self.nodes = [name for name, _ in nodes]
+        self.cardinalities = dict(nodes)
+        self.parents = {name: tuple((parents or {}).get(name, ())) for name in self.nodes}
+        for name, node_parents in self.parents.items():
+            for parent in node_parents:
+                if parent not in self.cardinalities:
+                    raise ValueError("unknown parent {} of node {}".format(parent, name))
+        self.counts = {name: np.zeros(self._shape(name), dtype=np.int64) for name in self.nodes}
+
+    def _shape(self, name):
+        return tuple(self.cardinalities[parent] for parent in self.parents[name]) + (self.cardinalities[name],)
+
+    def _columns(self, name):
+        return [self.nodes.index(node) for node in self.parents[name] + (name,)]
+
+    def fit(self, data):
+        '''
+        Rebuild every CPT from scratch by counting rows of data (one column per node, in node order)
+        '''
+        data = np.asarray(data, dtype=np.intp).reshape(-1, len(self.nodes))
+        for name in self.nodes:
+            shape = self._shape(name)
+            packed = np.ravel_multi_index(tuple(data[:, self._columns(name)].T), shape)
+            self.counts[name] = np.bincount(packed, minlength=int(np.prod(shape))).reshape(shape)
+        return self
+
+    def update(self, sample):
+        '''
+        Add a single row in O(number of nodes)
+        '''
+        sample = [int(value) for value in sample]
+        for name in self.nodes:
+            self.counts[name][tuple(sample[column] for column in self._columns(name))] += 1
+
+    def cpt(self, name):
+        '''
+        returns the CPT of a node, cpt[parent values..., value] = P(value | parent values)
+        '''
+        counts = self.counts[name].astype(float)
+        total = counts.sum(axis=-1, keepdims=True)
+        return np.divide(counts, total, out=np.full(counts.shape, 1. / counts.shape[-1]), where=total > 0)
+
+    def posterior(self, query, evidence=None):
+        '''
+        returns P(query | evidence) as an array indexed by the values of the query node, where evidence maps node
+        names to observed values
+        '''
+        evidence = evidence or {}
+        if query in evidence:
+            raise ValueError("the query node {} is also given as evidence".format(query))
+        letters = dict(zip(self.nodes, string.ascii_letters))
+        factors = []
+        subscripts = []
+        for name in self.nodes:
+            factor = self.cpt(name)
+            axes = self.parents[name] + (name,)
+            index = tuple(evidence[node] if node in evidence else slice(None) for node in axes)
+            factors.append(factor[index])
+            subscripts.append(''.join(letters[node] for node in axes if node not in evidence))
+        expression = ','.join(subscripts) + '->' + letters[query]
+        joint = np.einsum(expression, *factors, optimize=True)
+        total = joint.sum()
+        if total == 0: # evidence that was never observed together
+            return np.full(joint.shape, 1. / len(joint))
+        return joint / total
+
+def v_dag():
+    '''
+    returns the V-DAG: the next computer move ('prediction') conditioned on the previous human and computer moves
+    '''
+    return DiscreteBayesNet([('human', 3), ('computer', 3), ('prediction', 3)], {'prediction': ('human', 'computer')})
+
+def inv_v_dag():
+    '''
+    returns the Inv(V-DAG) (Naive Bayes): the previous human and computer moves both conditioned on the next computer
+    move ('Y')
+    '''
+    return DiscreteBayesNet([('human', 3), ('computer', 3), ('Y', 3)], {'human': ('Y',), 'computer': ('Y',)})
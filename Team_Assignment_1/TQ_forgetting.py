@@ -0,0 +1,161 @@
+'''
+Forgetting variants of the V-DAG and Inv(V-DAG) count models for opponents that switch strategies.
+
+With plain counts every row of training_data weighs the same forever, so the models adapt slowly when the opponent
+switches between e.g. win-stay_lose-shift and win-shift_lose-shift. Two variants fix that:
+
+    Exponential decay - a row that is t rounds old weighs 0.5 ** (t / half_life). Instead of multiplying the whole
+                        table by the decay factor every round, each new row is added with a global scale that grows
+                        by 1 / decay per round. Posteriors are ratios of counts, so the common scale cancels out; the
+                        table is only renormalised once the scale gets huge (once every few thousand rounds).
+    Sliding window    - only the last window rows count. The rows are kept in a ring buffer and the row that falls
+                        out of the window is subtracted when a new one is added.
+
+Both keep update and predict O(1) per round, and both support partial_fit() so long histories can be fitted chunk by
+chunk (see TQ_stream).
+'''
+
+# Import required libraries
+import numpy as np
+from TQ_bayes_net import VDAGModel
+from TQ_inv_bayes_net import InvVDAGModel
+
+FORGETTING_OPTIONS = ['None', 'Sliding window', 'Exponential decay']
+
+class DecayedCounts:
+    '''
+    Mixin turning a count model into an exponentially decayed one
+    '''
+
+    count_dtype = float
+    RESCALE_AT = 1e100
+
+    def __init__(self, training_data=None, half_life=100):
+        if half_life <= 0:
+            raise ValueError("half_life must be positive")
+        self.half_life = half_life
+        self.decay = 0.5 ** (1. / half_life)
+        self.scale = 1.
+        super().__init__(training_data)
+
+    def fit(self, training_data):
+        '''
+        Rebuild the counts from scratch, the last row of training_data being the most recent one
+        '''
+        rows = np.asarray(training_data, dtype=np.intp).reshape(-1, 3)
+        self._fit_rows(rows, self.decay ** np.arange(len(rows) - 1, -1, -1, dtype=float))
+        self.scale = 1. / self.decay
+        self._invalidate()
+        return self
+
+    def partial_fit(self, training_data):
+        '''
+        Add a block of rows, e.g. the next chunk of a long history, the last row being the most recent one.
+        Every older row ages by the length of the block, so fitting a history chunk by chunk gives the counts of fit()
+        '''
+        rows = np.asarray(training_data, dtype=np.intp).reshape(-1, 3)
+        # The stored counts are weights times scale * decay; bring them back to the weights of the newest row,
+        # age them by len(rows) and add the block with the same weights fit() would give it
+        age = self.decay ** len(rows) / (self.scale * self.decay)
+        new_counts = self._row_counts(rows, self.decay ** np.arange(len(rows) - 1, -1, -1, dtype=float))
+        for counts, block_counts in zip(self._count_arrays(), new_counts):
+            counts *= age
+            counts += block_counts
+        self.scale = 1. / self.decay
+        self._invalidate()
+        return self
+
+    def update(self, sample):
+        '''
+        Add a single [prev_hm, prev_cm, cur_cm] row in O(1), ageing every older row by one round
+        '''
+        h, c, y = (int(move) for move in sample)
+        self._add(h, c, y, self.scale)
+        self.scale /= self.decay
+        if self.scale > self.RESCALE_AT:
+            for counts in self._count_arrays():
+                counts /= self.scale
+            self.scale = 1.
+        self._invalidate()
+
+class WindowedCounts:
+    '''
+    Mixin turning a count model into one that only counts the last window rows
+    '''
+
+    def __init__(self, training_data=None, window=100):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.recent = np.zeros((window, 3), dtype=np.intp)  # ring buffer of the rows in the window
+        self.n_recent = 0
+        self.position = 0                                    # where the next row goes in the ring buffer
+        super().__init__(training_data)
+
+    def fit(self, training_data):
+        '''
+        Rebuild the counts from scratch using the last window rows of training_data
+        '''
+        rows = np.asarray(training_data, dtype=np.intp).reshape(-1, 3)[-self.window:]
+        self._fit_rows(rows)
+        self.recent[:len(rows)] = rows
+        self.n_recent = len(rows)
+        self.position = len(rows) % self.window
+        self._invalidate()
+        return self
+
+    def partial_fit(self, training_data):
+        '''
+        Add a block of rows, e.g. the next chunk of a long history. Only the last window rows of the block can stay in
+        the window; they go through the ring buffer and the rows they push out are subtracted
+        '''
+        rows = np.asarray(training_data, dtype=np.intp).reshape(-1, 3)[-self.window:]
+        n_dropped = max(0, self.n_recent + len(rows) - self.window)
+        oldest = (self.position - self.n_recent) % self.window
+        dropped = self.recent[(oldest + np.arange(n_dropped)) % self.window]
+        for counts, old_counts, new_counts in zip(self._count_arrays(), self._row_counts(dropped),
+                                                  self._row_counts(rows)):
+            counts -= old_counts
+            counts += new_counts
+        self.recent[(self.position + np.arange(len(rows))) % self.window] = rows
+        self.position = (self.position + len(rows)) % self.window
+        self.n_recent = min(self.window, self.n_recent + len(rows))
+        self._invalidate()
+        return self
+
+    def update(self, sample):
+        '''
+        Add a single [prev_hm, prev_cm, cur_cm] row in O(1), dropping the oldest row once the window is full
+        '''
+        h, c, y = (int(move) for move in sample)
+        if self.n_recent == self.window:
+            self._add(*self.recent[self.position], -1)
+        else:
+            self.n_recent += 1
+        self.recent[self.position] = (h, c, y)
+        self.position = (self.position + 1) % self.window
+        self._add(h, c, y, 1)
+        self._invalidate()
+
+class DecayedVDAGModel(DecayedCounts, VDAGModel):
+    pass
+
+class WindowedVDAGModel(WindowedCounts, VDAGModel):
+    pass
+
+class DecayedInvVDAGModel(DecayedCounts, InvVDAGModel):
+    pass
+
+class WindowedInvVDAGModel(WindowedCounts, InvVDAGModel):
+    pass
+
+def make_models(training_data, forgetting='None', length=100):
+    '''
+    returns the (V-DAG, Inv(V-DAG)) pair for one of the FORGETTING_OPTIONS, where length is the window size or the
+    half-life in rounds
+    '''
+    if forgetting == 'Sliding window':
+        return WindowedVDAGModel(training_data, window=length), WindowedInvVDAGModel(training_data, window=length)
+    if forgetting == 'Exponential decay':
+        return DecayedVDAGModel(training_data, half_life=length), DecayedInvVDAGModel(training_data, half_life=length)
+    return VDAGModel(training_data), InvVDAGModel(training_data)
@@ -0,0 +1,132 @@
+'''
+Append-only binary log of every round played.
+
+Each round is one fixed-width 16 byte record (see ROUND_DTYPE) after a 16 byte file header, so the log can be
+appended to without rewriting anything and read back through np.memmap without loading or copying it: a
+multi-million-round history opens instantly. Unlike the old data.npy dump, nothing is overwritten when a game is reset.
+
+Example (summarises a log):
+    python TQ_game_log.py game_log.rpslog
+'''
+
+# Import required libraries
+import os
+import sys
+import time
+import numpy as np
+from TQ_moves import MOVE_DTYPE, STRATEGIES, WINNERS
+
+LOG_PATH = "game_log.rpslog"
+
+# File header: magic, format version and record size
+MAGIC = b'RPSLOG'
+VERSION = 1
+HEADER_DTYPE = np.dtype([('magic', 'S6'), ('version', '<u2'), ('record_size', '<u4'), ('reserved', '<u4')])
+
+# One record per round
+ROUND_DTYPE = np.dtype([
+    ('human', 'u1'),          # human move code
+    ('computer', 'u1'),       # computer move code
+    ('winner', 'u1'),         # winner code (tie, human, computer)
+    ('strategy', 'u1'),       # index of the computer strategy in STRATEGIES
+    ('game', '<u4'),          # game number, increasing over the whole log
+    ('timestamp', '<f8'),     # seconds since the epoch
+])
+
+def _header():
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header['magic'] = MAGIC
+    header['version'] = VERSION
+    header['record_size'] = ROUND_DTYPE.itemsize
+    return header.tobytes()
+
+def _check_header(path):
+    with open(path, 'rb') as f:
+        header = np.frombuffer(f.read(HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE)
+    if len(header) != 1 or header['magic'][0] != MAGIC or header['record_size'][0] != ROUND_DTYPE.itemsize:
+        raise ValueError("{} is not a round log".format(path))
+
+def open_log(path=LOG_PATH):
+    '''
+    returns a read-only, zero-copy view of all the records in the log (an empty array if there is no log yet)
+    '''
+    if not os.path.exists(path):
+        return np.zeros(0, dtype=ROUND_DTYPE)
+    _check_header(path)
+    n_rounds = (os.path.getsize(path) - HEADER_DTYPE.itemsize) // ROUND_DTYPE.itemsize
+    if n_rounds == 0:
+        return np.zeros(0, dtype=ROUND_DTYPE)
+    # A partially written trailing record (e.g. after a crash) is ignored
+    return np.memmap(path, dtype=ROUND_DTYPE, mode='r', offset=HEADER_DTYPE.itemsize, shape=(n_rounds,))
+
+def log_history(log):
+    '''
+    returns the [human_move, computer_move] rounds of a log, in the same layout as data.npy
+    '''
+    return np.stack((log['human'], log['computer']), axis=1).astype(MOVE_DTYPE)
+
+def log_triples(log, start=0):
+    '''
+    returns the [prev_hm, prev_cm, cur_cm] rows of consecutive rounds of the same game, for every round from start on
+    (the round before start is still used as the previous round of the first one)
+    '''
+    first = max(start - 1, 0)
+    log = log[first:]
+    same_game = log['game'][:-1] == log['game'][1:]
+    return np.stack((log['human'][:-1][same_game], log['computer'][:-1][same_game], log['computer'][1:][same_game]),
+                    axis=1).astype(MOVE_DTYPE)
+
+class GameLog:
+    '''
+    Appends rounds to the log as they are played. Records are flushed after every round so that closing the window
+    never loses the game in progress.
+    '''
+
+    def __init__(self, path=LOG_PATH):
+        self.path = path
+        self.rounds_in_game = 0
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            _check_header(path)
+            log = open_log(path)
+            self.game = int(log['game'][-1]) + 1 if len(log) else 0  # next unused game number
+            self.file = open(path, 'ab')
+            # Drop a partially written trailing record so that every record stays aligned
+            self.file.truncate(HEADER_DTYPE.itemsize + len(log) * ROUND_DTYPE.itemsize)
+        else:
+            self.game = 0
+            self.file = open(path, 'ab')
+            self.file.write(_header())
+            self.file.flush()
+
+    def append(self, human_move, computer_move, winner, strategy):
+        '''
+        Writes the record of a single round
+        '''
+        record = np.zeros(1, dtype=ROUND_DTYPE)
+        record['human'] = human_move
+        record['computer'] = computer_move
+        record['winner'] = winner
+        record['strategy'] = STRATEGIES.index(strategy)
+        record['game'] = self.game
+        record['timestamp'] = time.time()
+        self.file.write(record.tobytes())
+        self.file.flush()
+        self.rounds_in_game += 1
+
+    def new_game(self):
+        '''
+        Starts numbering the following rounds as the next game (a game without any rounds keeps its number)
+        '''
+        if self.rounds_in_game:
+            self.game += 1
+            self.rounds_in_game = 0
+
+    def close(self):
+        self.file.close()
+
+if __name__ == '__main__':
+    for path in sys.argv[1:] or [LOG_PATH]:
+        log = open_log(path)
+        print("{}: {} rounds in {} games".format(path, len(log), len(np.unique(log['game']))))
+        for code, winner in enumerate(WINNERS):
+            print("    {}: {}".format(winner, int(np.sum(log['winner'] == code))))
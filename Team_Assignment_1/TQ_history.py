@@ -0,0 +1,79 @@
+'''
+Growable history buffer used for the rounds played (data) and the [prev_hm, prev_cm, cur_cm] triples (training_data).
+
+Appending a row used to mean np.concatenate on the whole history, i.e. a full copy every round. The buffer instead
+keeps a preallocated array with spare capacity that doubles when it fills up, so appends are O(1) amortized, and
+view() / column() hand out zero-copy slices of the rows written so far to the models.
+'''
+
+# Import required libraries
+import numpy as np
+from TQ_moves import MOVE_DTYPE
+
+class HistoryBuffer:
+
+    def __init__(self, width, initial=None, capacity=64, dtype=MOVE_DTYPE):
+        '''
+        width: number of columns per row (2 for rounds, 3 for triples)
+        initial: optional array of rows to start from
+        '''
+        rows = np.zeros((0, width), dtype=dtype) if initial is None else np.asarray(initial, dtype=dtype).reshape(-1, width)
+        self._buffer = np.empty((max(capacity, len(rows)), width), dtype=dtype)
+        self._buffer[:len(rows)] = rows
+        self._size = len(rows)
+
+    def append(self, row):
+        '''
+        Append a single row, doubling the capacity whenever the buffer is full
+        '''
+        if self._size == len(self._buffer):
+            grown = np.empty((2 * len(self._buffer), self._buffer.shape[1]), dtype=self._buffer.dtype)
+            grown[:self._size] = self._buffer[:self._size]
+            self._buffer = grown
+        self._buffer[self._size] = row
+        self._size += 1
+
+    def extend(self, rows):
+        '''
+        Append a block of rows, growing the capacity at most once
+        '''
+        rows = np.asarray(rows, dtype=self._buffer.dtype).reshape(-1, self._buffer.shape[1])
+        size = self._size + len(rows)
+        if size > len(self._buffer):
+            grown = np.empty((max(2 * len(self._buffer), size), self._buffer.shape[1]), dtype=self._buffer.dtype)
+            grown[:self._size] = self._buffer[:self._size]
+            self._buffer = grown
+        self._buffer[self._size:size] = rows
+        self._size = size
+
+    def view(self):
+        '''
+        returns a zero-copy (n, width) view of the rows written so far
+        Note that the view refers to the old storage once the buffer grows, so take a fresh one after appending
+        '''
+        return self._buffer[:self._size]
+
+    def column(self, j):
+        '''
+        returns a zero-copy view of column j of the rows written so far
+        '''
+        return self._buffer[:self._size, j]
+
+    def clear(self):
+        self._size = 0
+
+    @property
+    def shape(self):
+        return (self._size, self._buffer.shape[1])
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        return self.view()[index]
+
+    def __array__(self, dtype=None, copy=None):
+        rows = self.view()
+        if dtype is not None:
+            return rows.astype(dtype)
+        return rows.copy() if copy else rows
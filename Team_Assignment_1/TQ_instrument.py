@@ -0,0 +1,196 @@
+'''
+Per-round timing and counters.
+
+The game phases (opponent move, scoring, feedback, model fit, inference and GUI update) are wrapped in
+stats.timer(phase), which records how long they took and in which game and round. Counters keep things like the history
+size and the number of refits. Everything is kept in memory and can be read back with summary() / per_round() or written
+out with export() as JSONL or CSV (picked by the file extension).
+
+Instrumentation is off by default. Disabled, timer() hands back a shared no-op context manager and count() / gauge()
+return straight away, so the hooks cost a method call each. To switch it on for the game, set TQ_STATS to the file the
+stats should be exported to:
+    TQ_STATS=stats.jsonl python TQ_rps_game.py
+
+Example (summary of an exported file):
+    python TQ_instrument.py stats.jsonl
+'''
+
+# Import required libraries
+import contextlib
+import csv
+import json
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+PHASES = ['opponent_move', 'scoring', 'feedback', 'fit', 'inference', 'gui']
+
+_NULL_TIMER = contextlib.nullcontext()
+
+class _Timer:
+    __slots__ = ('stats', 'phase', 'game', 'round_number', 'start')
+
+    def __init__(self, stats, phase, game, round_number):
+        self.stats = stats
+        self.phase = phase
+        self.game = game
+        self.round_number = round_number
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats.record(self.phase, time.perf_counter() - self.start, self.round_number, self.game)
+        return False
+
+class Stats:
+    '''
+    In-process store of phase durations and counters. Timers may run on any thread (feedback and inference run on the
+    inference worker), so events are appended under a lock
+    '''
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.game = 0       # current game, round numbers start over in every game
+        self.round = 0      # current round, used by timers that are not given a round explicitly
+        self.events = []    # (game, round, phase, seconds)
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def timer(self, phase, round_number=None, game=None):
+        '''
+        returns a context manager timing phase; round_number and game default to the current ones. Timers created on
+        another thread (e.g. the inference worker) should be given the round and game that queued the work
+        '''
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, phase, self.game if game is None else game,
+                      self.round if round_number is None else round_number)
+
+    def record(self, phase, seconds, round_number=None, game=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.events.append((self.game if game is None else game,
+                                self.round if round_number is None else round_number, phase, seconds))
+
+    def count(self, name, amount=1):
+        '''
+        Adds amount to a counter, e.g. the number of refits
+        '''
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        '''
+        Sets a counter to its latest value, e.g. the history size
+        '''
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = value
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+            self.counters = {}
+
+    def durations(self, phase):
+        '''
+        returns the recorded durations of a phase in seconds
+        '''
+        with self._lock:
+            events = list(self.events)
+        return self._durations(events, phase)
+
+    @staticmethod
+    def _durations(events, phase):
+        return np.array([seconds for _, _, event_phase, seconds in events if event_phase == phase], dtype=float)
+
+    def summary(self):
+        '''
+        returns {phase: {calls, mean_ms, p50_ms, p99_ms, max_ms, total_s}} for every phase seen, plus the counters
+        '''
+        # one consistent snapshot, the worker and GUI threads keep recording while this runs
+        with self._lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+        phases = {}
+        for phase in PHASES + sorted({event[2] for event in events} - set(PHASES)):
+            durations = self._durations(events, phase) * 1e3
+            if len(durations):
+                phases[phase] = {'calls': len(durations), 'mean_ms': float(durations.mean()),
+                                 'p50_ms': float(np.percentile(durations, 50)),
+                                 'p99_ms': float(np.percentile(durations, 99)),
+                                 'max_ms': float(durations.max()), 'total_s': float(durations.sum() / 1e3)}
+        return {'phases': phases, 'counters': counters}
+
+    def per_round(self):
+        '''
+        returns {(game, round): {phase: seconds}}, with several timings of the same phase in a round added up
+        '''
+        rounds = {}
+        with self._lock:
+            for game, round_number, phase, seconds in self.events:
+                row = rounds.setdefault((game, round_number), {})
+                row[phase] = row.get(phase, 0.) + seconds
+        return rounds
+
+    def export(self, path):
+        '''
+        Writes one line per event to path, as CSV if it ends with .csv and as JSON lines otherwise.
+        The counters go in a last line with phase "counters" (JSONL only)
+        '''
+        with self._lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+        if path.endswith('.csv'):
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['game', 'round', 'phase', 'seconds'])
+                writer.writerows(events)
+        else:
+            with open(path, 'w') as f:
+                for game, round_number, phase, seconds in events:
+                    event = {'game': game, 'round': round_number, 'phase': phase, 'seconds': seconds}
+                    f.write(json.dumps(event) + '\n')
+                f.write(json.dumps({'phase': 'counters', 'counters': counters}) + '\n')
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Reads back a file written by export(); files from before games were recorded count as game 0
+        '''
+        stats = cls(enabled=True)
+        with open(path, newline='') as f:
+            if path.endswith('.csv'):
+                stats.events = [(int(row.get('game') or 0), int(row['round']), row['phase'], float(row['seconds']))
+                                for row in csv.DictReader(f)]
+            else:
+                for line in f:
+                    event = json.loads(line)
+                    if event['phase'] == 'counters':
+                        stats.counters = event['counters']
+                    else:
+                        stats.events.append((event.get('game', 0), event['round'], event['phase'], event['seconds']))
+        return stats
+
+# Shared instance used by the game, enabled by the TQ_STATS environment variable
+STATS_PATH = os.environ.get('TQ_STATS')
+stats = Stats(enabled=bool(STATS_PATH))
+
+def print_summary(summary):
+    print("{:<14} {:>7} {:>10} {:>10} {:>10} {:>10}".format('phase', 'calls', 'mean ms', 'p50 ms', 'p99 ms', 'max ms'))
+    for phase, row in summary['phases'].items():
+        print("{:<14} {:>7} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}".format(
+            phase, row['calls'], row['mean_ms'], row['p50_ms'], row['p99_ms'], row['max_ms']))
+    for name, value in summary['counters'].items():
+        print("{}: {}".format(name, value))
+
+if __name__ == '__main__':
+    print_summary(Stats.load(sys.argv[1] if len(sys.argv) > 1 else "stats.jsonl").summary())
@@ -6,14 +6,34 @@ Github: https://github.com/jmschrei/pomegranate
 
 # Import required libraries
 import numpy as np
-from pomegranate import *
+from TQ_moves import MOVES, decode_move, decode_moves
+from TQ_posterior_table import PosteriorTableModel, normalize, make_prediction, log_prediction
+from TQ_discrete_bn import inv_v_dag
 
 # ****************Change .npy Name when necessary*********************
-# training_data = np.load("training_data.npy", allow_pickle=True) ## Load historical data
-# training_data = np.concatenate((training_data[:-1, :], training_data[1:,1].reshape(-1,1)), axis=1) ## Re-arrange the array such that column 1 contains previous human moves, column 2 contains previous computer moves and column 3 contains the next computer moves
+# training_data = load_history("training_data.npy") ## Load historical data as uint8 move codes (see TQ_moves)
+# training_data = to_triples(training_data) ## Re-arrange the array such that column 1 contains previous human moves, column 2 contains previous computer moves and column 3 contains the next computer moves
+
+def inv_predict_move(human_move, computer_move, training_data, backend='numpy'): # previous moves
+    '''
+    returns the most likely next computer move. The Inv(V-DAG) is fitted and queried with the NumPy engine in
+    TQ_discrete_bn, or with the legacy pomegranate network below if backend='pomegranate'
+    '''
+    if backend == 'pomegranate':
+        return pomegranate_inv_predict_move(human_move, computer_move, training_data)
+    net = inv_v_dag().fit(training_data)
+    prediction = make_prediction(net.posterior('Y', {'human': int(human_move), 'computer': int(computer_move)}))
+    log_prediction(prediction, "Y")
+    return prediction.predicted
+
+def pomegranate_inv_predict_move(human_move, computer_move, training_data): # previous moves
+    # pomegranate is slow to import, so it is only loaded once the legacy network is actually used
+    from pomegranate import BayesianNetwork, ConditionalProbabilityTable, DiscreteDistribution, State
+
+    # The pomegranate CPTs below are keyed by move names, so decode the move codes at this boundary
+    human_move, computer_move = decode_move(human_move), decode_move(computer_move)
+    training_data = decode_moves(training_data)
 
-def inv_predict_move(human_move, computer_move, training_data): # previous moves
-    
     # Initialize Y
     labels = DiscreteDistribution({'rock': 1./3, 'paper': 1./3, 'scissors': 1./3})
 
@@ -60,24 +80,90 @@ def inv_predict_move(human_move, computer_move, training_data): # previous moves
 
     model.fit(training_data) # will update Y and CPTs
     
-    # The following line returns the action that maximizes P(prediction|human_move,computer_move)
-    prediction = model.predict([[human_move, computer_move, None]]) # <<------------------ takes in previous hm, cm
-    
-    print ("Argmax_Prediction:{}".format(prediction[-1][-1]))
-    
-    output = prediction[-1][-1]
-    
-    # To generate predictions probabilities for each of the possible actions, provide as evidence "Human": "Rock" and "Computer":     # "Paper" to your model
+    # A single inference pass: the posterior of the last node given "Human" and "Computer" as evidence. Its argmax is the
+    # action that maximizes P(Y|human_move,computer_move), so model.predict is not needed on top of it
     predictions = model.predict_proba({"human": human_move, "computer": computer_move}) # <<------------------ takes in previous hm, cm
-        
-        # Print prediction probabilities for each node
-    for node, prediction in zip(model.states, predictions):
-        if isinstance(prediction, str):
-            print(f"{node.name}: {prediction}") ## Prints the current state (previous moves) of the Human and Computer Nodes in your Bayesian Network
-        else:
-            print(f"{node.name}")
-            for value, probability in prediction.parameters[0].items():
-                print(f"    {value}: {probability:.4f}")  ## Prints the probability for each possible action given the current state of the parents in your Bayesian Network
-    
-    return output
+    posterior = predictions[-1].parameters[0]
+    prediction = make_prediction(np.array([posterior[move] for move in MOVES]))
+
+    # Prints the posterior and the recommendation if the 'rps.prediction' logger is enabled (see TQ_posterior_table)
+    log_prediction(prediction, "Y")
+
+    return prediction.predicted
+
+
+def inv_posterior_table(label_counts, human_counts, computer_counts):
+    '''
+    returns table[..., h, c, y] = P(Y=y | human=h, computer=c) from Inv(V-DAG) counts N(Y) of shape (..., 3) and
+    N(Y, human), N(Y, computer) of shape (..., 3, 3). Unseen labels keep the uniform CPT rows they were initialised with
+    '''
+    prior = normalize(label_counts)                    # P(Y)
+    p_human = normalize(human_counts)                  # P(human | Y), rows indexed by Y
+    p_computer = normalize(computer_counts)            # P(computer | Y), rows indexed by Y
+    joint = np.einsum('...y,...yh,...yc->...hcy', prior, p_human, p_computer)
+    return normalize(joint)
+
+class InvVDAGModel(PosteriorTableModel):
+    '''
+    Persistent Inv(V-DAG) (Naive Bayes) that keeps the counts behind P(Y), P(human|Y) and P(computer|Y) instead of
+    refitting a pomegranate network every round. Appending a row is three increments, and the posterior over Y is
+    P(Y) * P(human|Y) * P(computer|Y) normalised over Y.
+    All moves are the integer codes from TQ_moves.
+    '''
+
+    count_dtype = np.int64
+
+    def __init__(self, training_data=None):
+        self.label_counts = np.zeros(3, dtype=self.count_dtype)           # N(Y)
+        self.human_counts = np.zeros((3, 3), dtype=self.count_dtype)      # N(Y, human)
+        self.computer_counts = np.zeros((3, 3), dtype=self.count_dtype)   # N(Y, computer)
+        if training_data is not None:
+            self.fit(training_data)
+
+    def fit(self, training_data):
+        '''
+        Rebuild the counts from scratch using rows of [prev_hm, prev_cm, cur_cm]
+        '''
+        self._fit_rows(np.asarray(training_data, dtype=np.intp).reshape(-1, 3))
+        self._invalidate()
+        return self
+
+    def update(self, sample):
+        '''
+        Add a single [prev_hm, prev_cm, cur_cm] row in O(1)
+        '''
+        h, c, y = (int(move) for move in sample)
+        self._add(h, c, y, 1)
+        self._invalidate()
+
+    def _row_counts(self, rows, weights=None):
+        return [np.bincount(rows[:, 2], weights=weights, minlength=3),
+                np.bincount(rows[:, 2] * 3 + rows[:, 0], weights=weights, minlength=9).reshape(3, 3),
+                np.bincount(rows[:, 2] * 3 + rows[:, 1], weights=weights, minlength=9).reshape(3, 3)]
+
+    def _fit_rows(self, rows, weights=None):
+        self.label_counts[:], self.human_counts[:], self.computer_counts[:] = self._row_counts(rows, weights)
+
+    def _add(self, h, c, y, weight):
+        self.label_counts[y] += weight
+        self.human_counts[y, h] += weight
+        self.computer_counts[y, c] += weight
+
+    def _count_arrays(self):
+        return [self.label_counts, self.human_counts, self.computer_counts]
+
+    def _compute_table(self):
+        return inv_posterior_table(self.label_counts, self.human_counts, self.computer_counts)
+
+def inv_predict_moves(human_moves, computer_moves, training_data):
+    '''
+    Batch counterpart of inv_predict_move: fits the Inv(V-DAG) once and returns the most likely next move for every
+    pair of previous moves
+    '''
+    return InvVDAGModel(training_data).predict_batch(human_moves, computer_moves)
 
+def inv_posterior_matrix(training_data):
+    '''
+    returns the 9x3 matrix of Inv(V-DAG) posteriors for every (human_move, computer_move) pair from a single fit
+    '''
+    return InvVDAGModel(training_data).posterior_matrix()
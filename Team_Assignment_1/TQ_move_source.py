@@ -0,0 +1,75 @@
+'''
+Seeded, batched source of random moves.
+
+get_computer_move used the global random module, one randint per round, so games could not be replayed and the draws
+could not be vectorized. A MoveSource wraps its own NumPy Generator and draws moves in blocks of block_size, handing
+them out one at a time with next() or as arrays with take(). The same seed always gives the same moves, however
+next() and take() calls are mixed.
+
+Independent streams (one per game, simulator, or server session) come from spawn(), which uses
+SeedSequence.spawn so that the child streams do not overlap whatever seeds are used.
+
+Example:
+    source = MoveSource(seed=42)
+    source.next()            # one move code
+    source.take(1000)        # uint8 array of 1000 move codes
+    a, b = source.spawn(2)   # two independent child streams
+'''
+
+# Import required libraries
+import numpy as np
+from TQ_moves import MOVE_DTYPE
+
+BLOCK_SIZE = 4096
+
+class MoveSource:
+
+    def __init__(self, seed=None, block_size=BLOCK_SIZE):
+        '''
+        seed: an int, a SeedSequence, or None for fresh OS entropy
+        '''
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence)
+        self.block_size = block_size
+        self._block = np.zeros(0, dtype=MOVE_DTYPE)
+        self._moves = []   # the same block as a list, indexing it is much cheaper than a NumPy scalar
+        self._position = 0
+
+    def _refill(self):
+        self._block = self.rng.integers(0, 3, size=self.block_size, dtype=MOVE_DTYPE)
+        self._moves = self._block.tolist()
+        self._position = 0
+
+    def next(self):
+        '''
+        returns the next random move code as an int
+        '''
+        if self._position == len(self._moves):
+            self._refill()
+        move = self._moves[self._position]
+        self._position += 1
+        return move
+
+    def take(self, n):
+        '''
+        returns the next n random move codes as a uint8 array
+        '''
+        moves = self._block[self._position:self._position + n]
+        self._position += len(moves)
+        if len(moves) == n:
+            return moves.copy()
+        # always draw whole blocks, so the moves do not depend on how next() and take() calls are mixed
+        pieces = [moves]
+        rest = n - len(moves)
+        while rest:
+            self._refill()
+            pieces.append(self._block[:rest])
+            self._position = len(pieces[-1])
+            rest -= self._position
+        return np.concatenate(pieces)
+
+    def spawn(self, n):
+        '''
+        returns n independent child MoveSources
+        '''
+        return [MoveSource(child, self.block_size) for child in self.seed_sequence.spawn(n)]
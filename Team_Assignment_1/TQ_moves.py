@@ -0,0 +1,92 @@
+'''
+Canonical integer encoding of the Rock-Paper-Scissors moves shared by the game, the Bayes nets and the data files.
+
+Moves are stored as uint8 codes (rock=0, paper=1, scissors=2) everywhere internally and are only converted to
+strings at the Tk and print layer. With this ordering, the move that beats m is (m + 1) % 3 and the winner of a
+round can be read off (human - computer) % 3.
+'''
+
+# Import required libraries
+import numpy as np
+
+# Move codes
+ROCK, PAPER, SCISSORS = 0, 1, 2
+MOVES = ('rock', 'paper', 'scissors')
+MOVE_INDEX = {move: code for code, move in enumerate(MOVES)}
+MOVE_DTYPE = np.uint8
+
+# Winner codes, ordered so that winner == (human - computer) % 3
+TIE, HUMAN, COMPUTER = 0, 1, 2
+WINNERS = ('tie', 'human', 'computer')
+
+# Strategies the computer can play, see get_ai_move
+STRATEGIES = ('random', 'win-stay_lose-shift', 'win-shift_lose-shift')
+
+def encode_move(move):
+    '''
+    returns the code of a single move given either its name or its code
+    '''
+    if isinstance(move, str):
+        return MOVE_INDEX[move]
+    return int(move)
+
+def decode_move(code):
+    '''
+    returns the name of a single move code
+    '''
+    return MOVES[int(code)]
+
+def encode_moves(moves):
+    '''
+    returns a uint8 array of codes for an array of move names (legacy string data) or of move codes
+    '''
+    moves = np.asarray(moves)
+    if moves.dtype.kind in 'iu':
+        return moves.astype(MOVE_DTYPE, copy=False)
+    codes = np.empty(moves.shape, dtype=MOVE_DTYPE)
+    for move, code in MOVE_INDEX.items():
+        codes[moves == move] = code
+    return codes
+
+def decode_moves(codes):
+    '''
+    returns an array of move names for an array of move codes
+    '''
+    return np.asarray(MOVES)[np.asarray(codes)]
+
+def counter_move(move):
+    '''
+    returns the move that beats the given move (works element-wise on arrays)
+    '''
+    return (move + 1) % 3
+
+def round_winner(computer_move, human_move):
+    '''
+    returns the winner code of a round (works element-wise on arrays)
+    '''
+    # 3 is added first so that unsigned codes never underflow
+    return (3 + human_move - computer_move) % 3
+
+def load_history(path):
+    '''
+    Loads a history of [human_move, computer_move] rounds as a uint8 array.
+    Legacy files holding pickled move strings are still accepted and are encoded on load.
+    '''
+    try:
+        history = np.load(path)
+    except ValueError:
+        history = np.load(path, allow_pickle=True)
+    return encode_moves(history).reshape(-1, 2)
+
+def save_history(path, history):
+    '''
+    Saves a history of [human_move, computer_move] rounds as a pickle-free uint8 .npy file
+    '''
+    np.save(path, np.asarray(history, dtype=MOVE_DTYPE).reshape(-1, 2))
+
+def to_triples(history):
+    '''
+    Re-arrange rounds such that column 1 contains previous human moves, column 2 contains previous computer moves
+    and column 3 contains the next computer moves
+    '''
+    return np.concatenate((history[:-1, :], history[1:, 1].reshape(-1, 1)), axis=1)
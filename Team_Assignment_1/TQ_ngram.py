@@ -0,0 +1,165 @@
+'''
+Higher-order n-gram opponent model.
+
+The V-DAG and the Inv(V-DAG) only look at the previous (human_move, computer_move) pair. This model conditions the
+next computer move on the last k rounds. Each round is packed into a single digit in 0..8 (human_move * 3 +
+computer_move), so a context of j rounds is a base-9 integer. A dict maps every packed context that has been seen to
+a row of a growable count table, so memory grows with the contexts actually seen rather than with 9^k.
+
+When the longest context has been seen fewer than min_count times, the prediction backs off to shorter contexts, down
+to the unconditional distribution of the next computer move. Updating and predicting are O(k) per round.
+
+The batch methods of PosteriorTableModel work too: the table then holds the posteriors of all nine last-round pairs
+given the older rounds currently in the context, rebuilt after every update.
+'''
+
+# Import required libraries
+from collections import deque
+import numpy as np
+from TQ_history import HistoryBuffer
+from TQ_posterior_table import PosteriorTableModel, make_prediction
+
+MAX_ORDER = 15 # the order is packed into the low 4 bits of a context key
+
+# number of previous rounds the 'N-gram' Bayes net option of the game and the server conditions on
+NGRAM_ORDER = 3
+
+def _key(context, order):
+    return context * (MAX_ORDER + 1) + order
+
+class NGramModel(PosteriorTableModel):
+    '''
+    Same interface as the count models in TQ_bayes_net / TQ_inv_bayes_net: rows are [prev_hm, prev_cm, cur_cm] and
+    predictions take the previous round's moves. The model remembers the older rounds itself, since consecutive rows
+    of training_data overlap (row i + 1 starts with the moves that row i predicts)
+    '''
+
+    def __init__(self, training_data=None, order=3, min_count=2):
+        if not 1 <= order <= MAX_ORDER:
+            raise ValueError("order must be between 1 and {}".format(MAX_ORDER))
+        self.order = order
+        self.min_count = min_count
+        self.index = {}                                 # packed context key -> row of the count table
+        self.counts = HistoryBuffer(3, dtype=np.int64)  # counts of the next computer move, one row per context
+        self.context = deque(maxlen=order - 1)          # packed rounds before the evidence, oldest first
+        if training_data is not None:
+            self.fit(training_data)
+
+    def fit(self, training_data):
+        '''
+        Rebuild the counts from scratch using consecutive rows of [prev_hm, prev_cm, cur_cm]
+        '''
+        self.index = {}
+        self.counts = HistoryBuffer(3, dtype=np.int64)
+        self.context.clear()
+        return self.partial_fit(training_data)
+
+    def partial_fit(self, training_data):
+        '''
+        Add consecutive rows of [prev_hm, prev_cm, cur_cm] that follow the rows already seen, e.g. the next chunk of a
+        long history. The rounds still in the context are carried over, so the contexts that span the chunk boundary
+        are counted exactly as if the history had been fitted in one go
+        '''
+        rows = np.asarray(training_data, dtype=np.int64).reshape(-1, 3)
+        carried = len(self.context)
+        rounds = np.concatenate((np.array(self.context, dtype=np.int64), rows[:, 0] * 3 + rows[:, 1]))
+        labels = rows[:, 2]
+        fresh = not self.index # nothing counted yet, so no key can be found in the index
+
+        # Vectorized counting, one order at a time: context holds the packed last j rounds of every row
+        context = np.zeros(len(rounds), dtype=np.int64)
+        for order in range(self.order + 1):
+            if order > 0:
+                context[order - 1:] += rounds[:max(len(rounds) - order + 1, 0)] * 9 ** (order - 1)
+            first = max(order - 1, carried) # rows of this chunk that have a full context of this order
+            keys, rows_of_keys = np.unique(_key(context[first:], order), return_inverse=True)
+            table = np.bincount(rows_of_keys * 3 + labels[first - carried:], minlength=3 * len(keys)).reshape(-1, 3)
+            self._add_counts(keys, table, fresh)
+
+        if self.order > 1:
+            # only the rounds of this chunk, the carried ones are still in the context
+            self.context.extend(rounds[carried:][-(self.order - 1):].tolist())
+        self._invalidate()
+        return self
+
+    def _add_counts(self, keys, table, fresh=False):
+        # Adds a count table whose rows belong to the given (unique) context keys, creating rows for new contexts.
+        # Keys of different orders never collide, so when the index started out empty every key is new
+        if fresh:
+            self.index.update(zip(keys.tolist(), range(len(self.counts), len(self.counts) + len(keys))))
+            self.counts.extend(table)
+            return
+        rows = np.array([self.index.setdefault(key, len(self.index)) for key in keys.tolist()], dtype=np.intp)
+        self.counts.extend(np.zeros((len(self.index) - len(self.counts), 3), dtype=np.int64))
+        self.counts.view()[rows] += table
+
+    def _keys(self, human_move, computer_move):
+        # Packed keys of the contexts of order 0..k ending with the given round, shortest first
+        keys = [_key(0, 0)]
+        context = 0
+        for order, packed_round in enumerate([int(human_move) * 3 + int(computer_move)] + list(reversed(self.context))):
+            context += packed_round * 9 ** order
+            keys.append(_key(context, order + 1))
+        return keys
+
+    def new_game(self):
+        '''
+        Forgets the older rounds of the context, so that no context spans two games
+        '''
+        self.context.clear()
+        self._invalidate()
+
+    def update(self, sample, learn=True):
+        '''
+        Add a single [prev_hm, prev_cm, cur_cm] row in O(k).
+        With learn=False only the context moves on, e.g. when real-time feedback is disabled
+        '''
+        h, c, y = (int(move) for move in sample)
+        if learn:
+            for key in self._keys(h, c):
+                row = self.index.get(key)
+                if row is None:
+                    row = self.index[key] = len(self.counts)
+                    self.counts.append((0, 0, 0))
+                self.counts.view()[row, y] += 1
+        if self.order > 1:
+            self.context.append(h * 3 + c)
+        self._invalidate()
+
+    def predict_proba(self, human_move, computer_move):
+        '''
+        returns the posterior over the next computer move from the longest context seen at least min_count times
+        '''
+        counts = self.counts.view()
+        for key in reversed(self._keys(human_move, computer_move)):
+            row = self.index.get(key)
+            if row is not None and counts[row].sum() >= self.min_count:
+                return counts[row] / counts[row].sum()
+        return np.full(3, 1./3)
+
+    def predict(self, human_move, computer_move):
+        '''
+        returns the most likely next computer move
+        '''
+        return int(np.argmax(self.predict_proba(human_move, computer_move)))
+
+    def _compute_table(self):
+        return np.array([[self.predict_proba(h, c) for c in range(3)] for h in range(3)])
+
+    def infer(self, human_move, computer_move):
+        '''
+        returns the Prediction (posterior, predicted move, recommended counter-move, entropy) in one backoff pass
+        '''
+        return make_prediction(self.predict_proba(human_move, computer_move))
+
+def ngram_predict_move(human_move, computer_move, training_data, order=3): # previous moves
+    '''
+    Counterpart of v_predict_move / inv_predict_move: fits on training_data and returns the most likely next move
+    '''
+    return NGramModel(training_data, order).predict(human_move, computer_move)
+
+def ngram_predict_moves(human_moves, computer_moves, training_data, order=3):
+    '''
+    Batch counterpart of ngram_predict_move: fits once and returns the most likely next move for every pair
+    '''
+    return NGramModel(training_data, order).predict_batch(human_moves, computer_moves)
@@ -0,0 +1,71 @@
+'''
+The computer opponent: picks the computer's move for the strategies in STRATEGIES and scores rounds.
+
+Used by the Tk game (TQ_rps_game) and the game server (TQ_server), so it does not import tkinter. Random moves come
+from a seeded MoveSource (see TQ_move_source): the module's own one, seeded by TQ_SEED, unless a caller passes its own
+stream, like every server session does.
+'''
+
+# Import required libraries
+import os
+from TQ_moves import TIE, HUMAN, COMPUTER, counter_move
+from TQ_scoring import OUTCOME
+from TQ_move_source import MoveSource
+
+# random moves of the computer; set TQ_SEED to replay the same games
+move_source = MoveSource(int(os.environ['TQ_SEED']) if os.environ.get('TQ_SEED') else None)
+
+def select_winner(computer_move, human_move):
+    """
+    return: winner code of the round (TIE, HUMAN or COMPUTER)
+    """
+    return int(OUTCOME[computer_move, human_move])
+
+def get_computer_move(source=None):
+    """
+    Takes the next move from a seeded MoveSource (see TQ_move_source), this module's own one unless another is given,
+    where, 0 - Rock, 1 - Paper, 2 - Scissors
+    returns the code of the ai move (ROCK | PAPER | SCISSORS)
+    """
+    return (source or move_source).next()
+
+def get_ai_move(data, user_strat, source=None):
+    '''
+    Implement the win-stay, lose-shift or the win-shift, lose-shift strategy
+    source is the MoveSource used for random moves (this module's own one by default)
+    '''
+    
+    # check if there is any data available from previous rounds
+    if data:
+        last_human_move, last_ai_move = data[-1]
+        
+        # get the winner of the previous round
+        winner = select_winner(last_ai_move,last_human_move)
+        
+        if user_strat == 'win-stay_lose-shift':
+            # implement win-stay, lose-shift strategy
+            if winner == COMPUTER:
+                # if the AI won the last round, choose the same move again
+                return last_ai_move
+            elif winner == HUMAN:
+                # if the AI lost the last round, shift to the move that beats the human's last move
+                return counter_move(last_human_move)
+            elif winner == TIE:
+                # if the last round was a tie, choose a random move
+                return get_computer_move(source)
+        elif user_strat == 'win-shift_lose-shift':
+            # implement win-shift, lose-shift strategy
+            if winner == COMPUTER:
+                # if the AI won the last round, choose the opponent's previous move
+                return last_human_move
+            elif winner == HUMAN:
+                # if the AI lost the last round, shift to the move that beats the human's last move
+                return counter_move(last_human_move)
+            elif winner == TIE:
+                # if the last round was a tie, choose a random move
+                return get_computer_move(source)
+        elif user_strat == 'random':
+            return get_computer_move(source)
+    else:
+        # if there is no previous data, choose a random move
+        return get_computer_move(source)
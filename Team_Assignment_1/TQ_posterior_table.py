@@ -0,0 +1,158 @@
+'''
+Both Bayes nets only ever condition on the previous (human_move, computer_move) pair, so there are just nine possible
+queries. Instead of running inference every round, a model keeps the full table of posteriors table[h, c, y] (the 9x3
+table, stored as 3x3x3 so it can be indexed by move codes) together with the argmax of every row.
+
+The table is only marked dirty when feedback() adds data and is rebuilt lazily on the next query, so in steady state
+a prediction is a single array index, and a batch of queries (or all nine contexts at once) a single fancy index.
+
+infer() answers a query in one pass with a Prediction holding everything the game needs (posterior, predicted move,
+recommended counter-move and entropy). The per-round printout of the posterior goes through the 'rps.prediction'
+logger and is only formatted when that logger is enabled for INFO.
+'''
+
+# Import required libraries
+import logging
+from collections import namedtuple
+import numpy as np
+from TQ_moves import counter_move, decode_move
+
+logger = logging.getLogger('rps.prediction')
+
+# Result of one inference: posterior over the next computer move (indexed by move code), its argmax, the counter-move
+# to play and the entropy of the posterior in bits
+Prediction = namedtuple('Prediction', ['posterior', 'predicted', 'recommended', 'entropy'])
+
+def normalize(weights):
+    '''
+    Normalises weights over the last axis; rows that sum to zero (never observed) become uniform
+    '''
+    weights = np.asarray(weights, dtype=float)
+    total = weights.sum(axis=-1, keepdims=True)
+    return np.divide(weights, total, out=np.full(weights.shape, 1./3), where=total > 0)
+
+def entropy(posterior):
+    '''
+    returns the entropy in bits of posteriors over the last axis
+    '''
+    posterior = np.asarray(posterior, dtype=float)
+    terms = np.where(posterior > 0, posterior * np.log2(np.where(posterior > 0, posterior, 1.)), 0.)
+    return -terms.sum(axis=-1)
+
+def make_prediction(posterior):
+    '''
+    returns the Prediction for a posterior over the next computer move
+    '''
+    predicted = int(np.argmax(posterior))
+    return Prediction(posterior, predicted, int(counter_move(predicted)), float(entropy(posterior)))
+
+def log_prediction(prediction, node_name="prediction"):
+    '''
+    Logs a Prediction the way the game used to print it every round (only if 'rps.prediction' logs at INFO)
+    '''
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    logger.info("Argmax_Prediction:%s", decode_move(prediction.predicted))
+    logger.info(node_name)
+    for value, probability in enumerate(prediction.posterior):
+        logger.info("    %s: %.4f", decode_move(value), probability)
+    logger.info("Recommended next move: %s (entropy %.3f bits)", decode_move(prediction.recommended), prediction.entropy)
+
+class PosteriorTableModel:
+    '''
+    Base class of the count models. Subclasses implement _compute_table() returning the 3x3x3 posterior table and
+    call _invalidate() whenever their counts change.
+    '''
+
+    _table = None
+    _argmax = None
+    _entropy = None
+    _dirty = True
+
+    def _compute_table(self):
+        raise NotImplementedError
+
+    def _invalidate(self):
+        self._dirty = True
+
+    def partial_fit(self, training_data):
+        '''
+        Add a block of rows of [prev_hm, prev_cm, cur_cm] to the counts, e.g. the next chunk of a long history.
+        Count models implement _row_counts(rows) returning arrays in the order of _count_arrays()
+        '''
+        rows = np.asarray(training_data, dtype=np.intp).reshape(-1, 3)
+        for counts, new_counts in zip(self._count_arrays(), self._row_counts(rows)):
+            counts += new_counts
+        self._invalidate()
+        return self
+
+    def new_game(self):
+        '''
+        Called before the rows of another game: rows of different games are not consecutive. The count models treat
+        every row on its own, so there is nothing to reset
+        '''
+
+    def posterior_table(self):
+        '''
+        returns table[h, c, y] = P(y | human_move=h, computer_move=c), rebuilding it first if the counts changed
+        '''
+        if self._dirty:
+            self._table = self._compute_table()
+            self._argmax = np.argmax(self._table, axis=-1)
+            self._entropy = entropy(self._table)
+            self._dirty = False
+        return self._table
+
+    def recommendation_table(self):
+        '''
+        returns the 3x3 table of recommended counter-moves for every (human_move, computer_move) pair
+        '''
+        self.posterior_table()
+        return counter_move(self._argmax)
+
+    def predict_proba(self, human_move, computer_move):
+        '''
+        returns the posterior over the next computer move as an array indexed by move code
+        '''
+        return self.posterior_table()[human_move, computer_move]
+
+    def predict(self, human_move, computer_move):
+        '''
+        returns the most likely next computer move
+        '''
+        self.posterior_table()
+        return int(self._argmax[human_move, computer_move])
+
+    def infer(self, human_move, computer_move):
+        '''
+        returns the Prediction for the previous round's moves from a single table lookup
+        '''
+        posterior = self.posterior_table()[human_move, computer_move]
+        predicted = int(self._argmax[human_move, computer_move])
+        return Prediction(posterior, predicted, int(counter_move(predicted)),
+                          float(self._entropy[human_move, computer_move]))
+
+    def predict_proba_batch(self, human_moves, computer_moves):
+        '''
+        returns the posteriors over the next computer move, shape (n, 3), for arrays of previous moves
+        '''
+        return self.posterior_table()[np.asarray(human_moves, dtype=np.intp), np.asarray(computer_moves, dtype=np.intp)]
+
+    def predict_batch(self, human_moves, computer_moves):
+        '''
+        returns the most likely next computer moves for arrays of previous moves
+        '''
+        self.posterior_table()
+        return self._argmax[np.asarray(human_moves, dtype=np.intp), np.asarray(computer_moves, dtype=np.intp)]
+
+    def recommend_batch(self, human_moves, computer_moves):
+        '''
+        returns the recommended counter-moves for arrays of previous moves
+        '''
+        return counter_move(self.predict_batch(human_moves, computer_moves))
+
+    def posterior_matrix(self):
+        '''
+        returns the 9x3 matrix of posteriors, row h * 3 + c holding P(y | human_move=h, computer_move=c)
+        '''
+        return self.posterior_table().reshape(9, 3)
@@ -15,33 +15,155 @@ Tkinter Documentation: https://docs.python.org/3/library/tk.html
 """
 
 ## Import required libraries
-import random
+import time
+STARTUP_START = time.perf_counter() # cold start reference for the startup measurement in __main__
+import logging
+import os
+import threading
 import tkinter as tk
 from tkinter import *
 import numpy as np
-from TQ_bayes_net import v_predict_move
-from TQ_inv_bayes_net import inv_predict_move
+from TQ_forgetting import FORGETTING_OPTIONS, make_models
+from TQ_ngram import NGramModel, NGRAM_ORDER
+from TQ_moves import ROCK, PAPER, SCISSORS, WINNERS, STRATEGIES, MOVE_DTYPE, decode_move
+from TQ_scoring import SCORE_DELTA
+from TQ_history import HistoryBuffer
+from TQ_game_log import GameLog
+from TQ_checkpoint import load_models, update_checkpoint, history_triples, history_games
+from TQ_worker import InferenceWorker
+from TQ_stream import fit_games
+from TQ_opponent import select_winner, get_ai_move
+from TQ_instrument import stats, STATS_PATH
+from TQ_posterior_table import log_prediction
+
+IMPORT_SECONDS = time.perf_counter() - STARTUP_START
+
+# the fitted models, declared global in get_human_move
+# They are loaded by load_training_data(), in the background while the welcome() form is being filled in
+v_model = None
+inv_model = None
+ngram_model = None
+training_data_loader = None
+
+# (forgetting, length) the V-DAG and Inv(V-DAG) were fitted with; the checkpoint models forget nothing
+models_forgetting = ('None', None)
+
+# number of rows the models have been fitted on
+history_size = 0
+
+# Every logged round is part of the models, as after a restart (load_models() replays the whole round log). Rounds
+# played with feedback 'No' leave the models frozen for the rest of their game, they are kept here and added when the
+# next game starts (see start_models)
+unlearned_rows = HistoryBuffer(3)
+
+def load_training_data():
+    '''
+    Fits the V-DAG, Inv(V-DAG) and n-gram counts on the historical data (training_data.npy plus the games in the round
+    log) once, they are then kept up to date by feedback()
+    The V-DAG and Inv(V-DAG) counts come from the checkpoint (see TQ_checkpoint), so only rounds logged since are
+    replayed. The n-gram model is fitted chunk by chunk, so the history is never read into memory as a whole
+    Moves are uint8 codes (rock=0, paper=1, scissors=2) internally; names are only used for the GUI and printing
+    '''
+    global v_model
+    global inv_model
+    global ngram_model
+    global history_size
+    with stats.timer('fit'):
+        v_model, inv_model = load_models()
+        # game by game, so that no n-gram context spans two games
+        ngram_model = fit_games(NGramModel(order=NGRAM_ORDER), history_games())
+    history_size = int(v_model.counts.sum())
+    stats.count('refits')
+    stats.gauge('history_size', history_size)
+
+def rebuild_models(forgetting, length):
+    '''
+    Refits the V-DAG and Inv(V-DAG) with the chosen way of forgetting old rows (see TQ_forgetting), streaming
+    training_data.npy and the round log. Without forgetting the models come from the checkpoint
+    '''
+    global v_model
+    global inv_model
+    global models_forgetting
+    with stats.timer('fit'):
+        if forgetting == 'None':
+            v_model, inv_model = load_models()
+        else:
+            v_model, inv_model = make_models(None, forgetting, length)
+            for triples in history_triples():
+                v_model.partial_fit(triples)
+                inv_model.partial_fit(triples)
+    models_forgetting = (forgetting, length)
+    stats.count('refits')
+
+def start_models(forgetting, length):
+    '''
+    Runs on the inference worker when a game starts: adds the rounds the last game played without feedback, then
+    refits the V-DAG and Inv(V-DAG) only if the forgetting option changed
+    '''
+    global history_size
+    rows = unlearned_rows.view().copy()
+    unlearned_rows.clear()
+    ngram_model.new_game() # the n-gram context does not carry over from the last game
+    if len(rows):
+        ngram_model.partial_fit(rows) # the last game, on its own
+        ngram_model.new_game()
+        history_size += len(rows)
+    if (forgetting, length) != models_forgetting:
+        rebuild_models(forgetting, length) # the round log already holds the rows of the last game
+    elif len(rows):
+        v_model.partial_fit(rows)
+        inv_model.partial_fit(rows)
+    stats.gauge('history_size', history_size)
+
+def start_loading_training_data():
+    '''
+    Starts load_training_data() on a background thread so that the window shows up straight away
+    '''
+    global training_data_loader
+    training_data_loader = threading.Thread(target=load_training_data, daemon=True)
+    training_data_loader.start()
 
-# load training data, declared global in get_human_move
-training_data = np.load("training_data.npy", allow_pickle=True) ## Load historical data
-training_data = np.concatenate((training_data[:-1, :], training_data[1:,1].reshape(-1,1)), axis=1)
+def wait_for_training_data():
+    '''
+    Blocks until the training data is loaded (normally long done by the time a game starts)
+    '''
+    if training_data_loader is None:
+        start_loading_training_data()
+    training_data_loader.join()
+
+# append-only round log, opened when the first game starts
+game_log = None
+
+# runs model updates and predictions off the Tk main loop, created with the window
+inference_worker = None
 
 # record round moves
 def save_data(hm, cm):
     '''
     This function collects data 
     '''
-    data.append([hm,cm])
+    data.append((hm, cm))
 
 # organize new data into the right format
 def save_real_time_data(data, computer_move):
-    newSamples = np.concatenate((np.array(data)[-1, :], np.array(computer_move).reshape(1))) # both 1d
+    last_human_move, last_ai_move = data[-1]
+    newSamples = np.array((last_human_move, last_ai_move, computer_move), dtype=MOVE_DTYPE) # [prev_hm, prev_cm, cur_cm]
     return newSamples
 
-# add newly collected real-time data to the loaded training_data
-def feedback(newSamples, training_data):
-    training_data = np.concatenate((training_data, newSamples.reshape(1, -1)), axis=0) # both 2d
-    return training_data
+# add newly collected real-time data to the models (round_number and game tell the stats which round it belongs to)
+def feedback(newSamples, round_number=None, game=None):
+    global history_size
+    with stats.timer('feedback', round_number, game):
+        v_model.update(newSamples)
+        inv_model.update(newSamples)
+        ngram_model.update(newSamples)
+    history_size += 1
+    stats.gauge('history_size', history_size)
+
+# keep a round played without feedback for the next game (see start_models)
+def hold_back(newSamples):
+    ngram_model.update(newSamples, learn=False) # the counts stay frozen, but the n-gram context follows the game
+    unlearned_rows.append(newSamples)
 
 def update_scores(winner):
     """
@@ -49,119 +171,112 @@ def update_scores(winner):
     """
     global total_computer_score
     global total_human_score
-    if (winner == 'human'):
-        total_human_score += 1
-        total_computer_score += 0
-    if (winner == 'computer'):
-        total_human_score += 0
-        total_computer_score += 1
-    if (winner == 'tie'):
-        total_human_score += 0
-        total_computer_score += 0
+    human_points, computer_points = SCORE_DELTA[winner]
+    total_human_score += int(human_points)
+    total_computer_score += int(computer_points)
         
     return total_human_score, total_computer_score
 
-def select_winner(computer_move, human_move):
-    """
-    return: winner of the round
-    """
-    if computer_move == human_move:
-        return 'tie'
-    if computer_move == 'rock':
-        if human_move == 'paper':
-            return 'human'
-        return 'computer'
-    elif computer_move == 'paper':
-        if human_move == 'rock':
-            return 'computer'
-        return 'human'
-    elif computer_move == 'scissors':
-        if human_move == 'paper':
-            return 'computer'
-        return 'human'
-
-def get_computer_move():
-    """
-    Using randint()m which is an inbuilt function of the random module in Python3, generate a number between (1,3)
-    where, 1 - Rock, 2 - Paper, 3 - Scissors
-    returns string representing what ai move (rock | paper | scissors)
-    """
-    move = random.randint(1, 3)
-    if move == 1:
-        return 'rock'
-    elif move == 2:
-        return 'paper'
-    else:
-        return 'scissors'
-
-# called in get_human_move()
-def get_ai_move(data, user_strat):
-    '''
-    Implement the win-stay, lose-shift or the win-shift, lose-shift strategy
-    '''
-    
-    # check if there is any data available from previous rounds
-    if data:
-        last_human_move = np.array(data)[-1,0]
-        last_ai_move = np.array(data)[-1,1]
-        
-        # get the winner of the previous round
-        winner = select_winner(last_ai_move,last_human_move)
-        
-        if user_strat == 'win-stay_lose-shift':
-            # implement win-stay, lose-shift strategy
-            if winner == "computer":
-                # if the AI won the last round, choose the same move again
-                return last_ai_move
-            elif winner == "human":
-                # if the AI lost the last round, shift to the next move
-                if last_human_move == 'rock':
-                    return 'paper'
-                elif last_human_move == 'paper':
-                    return 'scissors'
-                elif last_human_move == 'scissors':
-                    return 'rock'
-            elif winner == 'tie':
-                # if the last round was a tie, choose a random move
-                return get_computer_move()
-        elif user_strat == 'win-shift_lose-shift':
-            # implement win-shift, lose-shift strategy
-            if winner == "computer":
-                # if the AI won the last round, choose the opponent's previous move
-                return last_human_move
-            elif winner == "human":
-                # if the AI lost the last round, shift to the next move
-                if last_human_move == 'rock':
-                    return 'paper'
-                elif last_human_move == 'paper':
-                    return 'scissors'
-                elif last_human_move == 'scissors':
-                    return 'rock'
-            elif winner == 'tie':
-                # if the last round was a tie, choose a random move
-                return get_computer_move()
-        elif user_strat == 'random':
-            return get_computer_move()
-    else:
-        # if there is no previous data, choose a random move
-        return get_computer_move()
-    
-def get_real_time_bayes_net_human_move(human_move, computer_move, training_data):
+def get_real_time_bayes_net_human_move(human_move, computer_move):
     '''
     Implement a Bayesian Network that takes as input the previous round's moves and predicts the next move you should play
         The choice of Bayes network to use (V-DAG (Prediction|Human Move and Computer Move) or `]Naive Bayes (Inverted V-DAG) (Human Move|Prediction)x(Computer Move|Prediction))
+    returns the recommended next move. Runs on the inference worker thread
     '''
     if bayes == 'V-DAG':
-        predicted_move = v_predict_move(human_move, computer_move, training_data)
+        model, node_name = v_model, "prediction"
     elif bayes == 'Inv(V-DAG)':
-        predicted_move = inv_predict_move(human_move, computer_move, training_data)
-    
-    if predicted_move == 'rock':
-        print('Recommended next move: paper')
-    elif predicted_move == 'paper':
-        print('Recommended next move: scissors')
-    elif predicted_move == 'scissors':
-        print('Recommended next move: rock')    
+        model, node_name = inv_model, "Y"
+    elif bayes == 'N-gram':
+        model, node_name = ngram_model, "prediction"
+
+    prediction = model.infer(human_move, computer_move) # posterior, argmax, counter-move and entropy in one pass
+    log_prediction(prediction, node_name) # only printed with TQ_LOG_LEVEL=INFO
+    return prediction.recommended
+
+class RoundView:
+    '''
+    The widgets of a game (round prompt, round summary, recommendation and game summary). They are built once, when the
+    first game starts, and every round only updates their StringVars and shows or hides them, so the number of widgets
+    stays the same however many rounds and games are played
+    '''
+
+    def __init__(self, window):
+        self.tt = None # the entry holding the number of rounds of the current game
+        self.game_text = StringVar(window)
+        self.round_text = StringVar(window)
+        self.human_move_text = StringVar(window)
+        self.computer_move_text = StringVar(window)
+        self.winner_text = StringVar(window)
+        self.human_score_text = StringVar(window)
+        self.computer_score_text = StringVar(window)
+        self.recommendation_text = StringVar(window)
+        self.total_human_text = StringVar(window)
+        self.total_computer_text = StringVar(window)
+        self.result_text = StringVar(window)
+
+        def label(**options):
+            return Label(window, foreground='black', background='white', **options)
+
+        def button(text, command):
+            return Button(window, foreground='black', background='white', text=text, command=command)
+
+        # (widget, x, y) of every group of widgets that is shown or hidden together
+        self.game_widgets = [
+            (label(textvariable=self.game_text), 40, 180),
+            (label(text='----------------------------------------------'), 40, 200),
+        ]
+        self.move_widgets = [
+            (label(text='Enter your move (rock|paper|scissors):'), 40, 240),
+            (label(textvariable=self.round_text), 40, 280),
+            (button('Rock', lambda t=ROCK: get_human_move(t, self.tt)), 330, 240),
+            (button('Paper', lambda t=PAPER: get_human_move(t, self.tt)), 430, 240),
+            (button('Scissors', lambda t=SCISSORS: get_human_move(t, self.tt)), 530, 240),
+        ]
+        self.result_widgets = [
+            (label(textvariable=self.human_move_text), 240, 300),
+            (label(textvariable=self.computer_move_text), 240, 340),
+            (label(textvariable=self.winner_text), 240, 380),
+            (label(textvariable=self.human_score_text), 240, 420),
+            (label(textvariable=self.computer_score_text), 240, 460),
+            (button('Continue Playing', lambda: reset(self.tt)), 100, 500),
+        ]
+        self.recommendation_widgets = [
+            (label(textvariable=self.recommendation_text), 440, 300),
+        ]
+        ## Clicking "Reset Game" ends the game and brings back the welcome form
+        self.summary_widgets = [
+            (label(text='Game Summary'), 240, 280),
+            (label(textvariable=self.total_human_text), 240, 320),
+            (label(textvariable=self.total_computer_text), 240, 360),
+            (label(textvariable=self.result_text), 240, 400),
+            (button('Reset Game', lambda xx="reset": reset_game(xx)), 240, 500),
+        ]
+
+    def show(self, widgets):
+        for widget, x, y in widgets:
+            widget.place(x = x, y = y)
+
+    def hide(self, *groups):
+        for widgets in groups:
+            for widget, _, _ in widgets:
+                widget.place_forget()
+
+    def hide_all(self):
+        self.hide(self.game_widgets, self.move_widgets, self.result_widgets, self.recommendation_widgets,
+                  self.summary_widgets)
+
+# built by playgame() when the first game starts
+round_view = None
+
+# called on the GUI thread once the inference worker has a recommendation
+def show_recommendation(recommended_move, round_number, game=None):
+    if round_number != count: # the player has already moved on to the next round
+        stats.count('stale_recommendations')
+        return
+    with stats.timer('gui', round_number, game):
+        round_view.recommendation_text.set('Recommended: {}'.format(decode_move(recommended_move)))
+        round_view.show(round_view.recommendation_widgets)
 
 # called in display_module()
 def get_human_move(human_move, tt):
@@ -169,108 +284,78 @@ def get_human_move(human_move, tt):
     returns a valid move from the human (rock, paper, or scissors) and updates the scores and returns a winner
     """
 
-    global continue_playing_button
-    global training_data
+    stats.round = count
+    stats.count('rounds')
+    # the worker runs this round's jobs later, by then stats.round may already be the next round
+    round_number, game = count, stats.game
 
     # Game Mode <<------------------------------------
-    computer_move = get_ai_move(data,user_strat) 
-    
-    # Select the winner
-    winner = select_winner(computer_move, human_move)
-
-    # Update the scores
-    update_scores(winner)
-    
-    if enable_feedback == 'Yes':
-        if data: # 1st round has no saved game data
-            # [prev_hm, prev_cm, cur_cm]
-            newSamples = save_real_time_data(data, computer_move)
+    with stats.timer('opponent_move'):
+        computer_move = get_ai_move(data,user_strat)
 
-            # add newly collected real-time data to loaded training_data
-            training_data = feedback(newSamples, training_data)
-    
-    # sanity check
-    print(training_data.shape)
-    
-    ## Predict opponent's most likely next move
-    # get_bayes_net_human_move(human_move, computer_move)
-    get_real_time_bayes_net_human_move(human_move, computer_move, training_data)
-    
-    # original save_data
-    save_data(human_move, computer_move)
+    with stats.timer('scoring'):
+        # Select the winner
+        winner = select_winner(computer_move, human_move)
 
-    # Print round summary
-    HM_label=Label(Window, foreground='black',background='white', text='Human move was {}'.format(human_move))
-    HM_label.place(x = 240,y = 300) 
+        # Update the scores
+        update_scores(winner)
 
-    CM_label=Label(Window, foreground='black',background='white', text='Computer move was {}'.format(computer_move))
-    CM_label.place(x = 240,y = 340) 
+    # Model updates and predictions run on the inference worker so that this callback never blocks the window
+    if data: # 1st round has no saved game data
+        # [prev_hm, prev_cm, cur_cm]
+        newSamples = save_real_time_data(data, computer_move)
 
-    W_label=Label(Window, foreground='black',background='white', text='Winner is {}'.format(winner))
-    W_label.place(x = 240,y = 380) 
-
-    CSH_label=Label(Window, foreground='black',background='white', text='Current score for human: {}'.format(total_human_score))
-    CSH_label.place(x = 240,y = 420) 
+        if enable_feedback == 'Yes':
+            # add newly collected real-time data to the models
+            inference_worker.update(lambda: feedback(newSamples, round_number, game))
+        else:
+            inference_worker.update(lambda: hold_back(newSamples))
 
-    CSC_label=Label(Window, foreground='black',background='white', text='Current score for computer: {}'.format(total_computer_score))
-    CSC_label.place(x = 240,y = 460) 
+    ## Predict opponent's most likely next move
+    # get_bayes_net_human_move(human_move, computer_move)
+    def recommend():
+        with stats.timer('inference', round_number, game):
+            return get_real_time_bayes_net_human_move(human_move, computer_move)
+    inference_worker.request(recommend, lambda move: show_recommendation(move, round_number, game))
 
-    continue_playing_button=Button(Window, foreground='black',background='white',text='Continue Playing',command=lambda xx= tt: reset(xx))
-    continue_playing_button.place(x = 100, y = 500)
+    # original save_data
+    save_data(human_move, computer_move)
+    game_log.append(human_move, computer_move, winner, user_strat)
 
-    labels.extend([HM_label,CM_label,W_label,CSH_label,CSC_label,continue_playing_button])
+    with stats.timer('gui'):
+        # Print round summary
+        round_view.human_move_text.set('Human move was {}'.format(decode_move(human_move)))
+        round_view.computer_move_text.set('Computer move was {}'.format(decode_move(computer_move)))
+        round_view.winner_text.set('Winner is {}'.format(WINNERS[winner]))
+        round_view.human_score_text.set('Current score for human: {}'.format(total_human_score))
+        round_view.computer_score_text.set('Current score for computer: {}'.format(total_computer_score))
+        round_view.show(round_view.result_widgets)
 
 
 def reset(tt):
     '''
-    This function is used to reset a round after it has been played as well as to terminate the game and display the game summary 
+    This function is used to reset a round after it has been played as well as to terminate the game and display the game summary
     once the input number of rounds have been played
     '''
-    for label in labels:
-        label.destroy()
     global count
     count += 1
     display_module(tt)
 
     if count == int(tt.get()):
-        for label in labels:
-            label.destroy()
-
-        for label in labels2:
-            label.destroy()
-
-        GS_label=Label(Window, foreground='black',background='white', text='Game Summary')
-        GS_label.place(x = 240,y = 280) 
-
-        # Print round summary
-        TSH_label=Label(Window, foreground='black',background='white', text='Total score for Human: {}'.format(total_human_score))
-        TSH_label.place(x = 240,y = 320) 
-
-        TSC_label=Label(Window, foreground='black',background='white', text='Total score for Computer: {}'.format(total_computer_score))
-        TSC_label.place(x = 240,y = 360) 
-
-        labels2.extend([GS_label,TSH_label,TSC_label])
+        round_view.hide_all()
 
+        # Print game summary
+        round_view.total_human_text.set('Total score for Human: {}'.format(total_human_score))
+        round_view.total_computer_text.set('Total score for Computer: {}'.format(total_computer_score))
 
         if total_computer_score > total_human_score:
-            computer_label=Label(Window, foreground='black',background='white', text='Computer Wins!')
-            computer_label.place(x = 240,y = 400) 
-            labels2.append(computer_label)
-
+            round_view.result_text.set('Computer Wins!')
         elif total_computer_score < total_human_score:
-            human_label=Label(Window, foreground='black',background='white', text='Human Wins!')
-            human_label.place(x = 240,y = 400) 
-            labels2.append(human_label)
-
+            round_view.result_text.set('Human Wins!')
         else:
-            tie_label=Label(Window, foreground='black',background='white', text='Series ended in a tie')
-            tie_label.place(x = 240,y = 400) 
-            labels2.append(tie_label)
+            round_view.result_text.set('Series ended in a tie')
 
-        ## Clicking "Reset Game" terminates the game and dumps all data collected in this game
-        reset_button=Button(Window, foreground='black',background='white',text='Reset Game',command= lambda xx= "reset": reset_game(xx))
-        reset_button.pack()
-        reset_button.place(x = 240, y = 500)
+        round_view.show(round_view.summary_widgets)
 
 
 def display_module(tt): # take user's move
@@ -278,50 +363,62 @@ def display_module(tt): # take user's move
     This function to asks you to select a move
 
     '''
-    round_label=Label(Window, foreground='black',background='white', text='Round {}'.format(count+1))
-    round_label.place(x = 40, y = 280)
-
-    select_label=Label(Window, foreground='black',background='white', text='Enter your move (rock|paper|scissors):')
-    select_label.place(x = 40, y = 240)
-
-    rock_button=Button(Window, foreground='black',background='white',text='Rock',command=lambda t= "rock": get_human_move(t,tt))
-    rock_button.place(x = 330, y = 240)
-
-    paper_button=Button(Window, foreground='black',background='white',text='Paper',command=lambda t= "paper": get_human_move(t,tt))
-    paper_button.place(x = 430, y = 240)
-
-    scissors_button=Button(Window, foreground='black',background='white',text='Scissors',command= lambda t= "scissors": get_human_move(t,tt))
-    scissors_button.place(x = 530, y = 240)
-
-    labels2.extend([round_label,select_label,round_label,paper_button,scissors_button,rock_button])
+    round_view.tt = tt
+    round_view.round_text.set('Round {}'.format(count+1))
+    round_view.hide(round_view.result_widgets, round_view.recommendation_widgets)
+    round_view.show(round_view.move_widgets)
 
 def reset_game(xx):
     '''
-    This function is used to reset a game after all rounds have been played as well as saves previously collected moves
-    Note that clicking on reset dumps all previously collected data onto a numpy file and resets the game
-    You might want to modify this function such that you keep collecting data and the numpy dumping happens only when you click "Exit Program"
+    This function is used to reset a game after all rounds have been played
+    Every round has already been appended to the round log (see TQ_game_log) as it was played, so nothing is dumped or
+    overwritten here; the next game is simply numbered as a new game in the same log
+    The model checkpoint is brought up to date with the finished game
     '''
     if xx == "reset":
-        for label in labels2:
-            label.destroy()
-    np.array(data).dump(open('data.npy', 'wb'))
+        round_view.hide_all()
+    inference_worker.update(update_checkpoint)
+    if STATS_PATH:
+        stats.export(STATS_PATH)
     welcome()
 
+def exit_program():
+    '''
+    Saves the model checkpoint (and the stats if TQ_STATS is set) and closes the window, even if saving fails
+    '''
+    try:
+        if game_log is not None:
+            game_log.close()
+        update_checkpoint()
+        if STATS_PATH:
+            stats.export(STATS_PATH)
+    finally:
+        Window.destroy()
+
+# set once welcome() has built the form, which then stays on screen with the previous game's choices
+welcome_built = False
+
 def welcome(): # take in user_strat, game rounds
     '''
     This welcome function asks you to enter the number of rounds you would like to play and enables you to start playing the game
+    The form is only built the first time, later calls (after a game is reset) keep the existing widgets
     '''
-    games_label=Label(Window, foreground='black',background='white', text='Enter the names of rounds you want to play:') 
+    global welcome_built
+    if welcome_built:
+        return
+    welcome_built = True
+
+    games_label=Label(Window, foreground='black',background='white', text='Enter the names of rounds you want to play:')
     games_label.place(x = 40,y = 100)
 
     user_entry = Entry(Window, width = 5)
     user_entry.pack()
-    user_entry.place(x = 330, y = 97) 
+    user_entry.place(x = 330, y = 97)
     
     # Create the list of options
-    options_list = ["random", "win-stay_lose-shift", "win-shift_lose-shift"]
+    options_list = list(STRATEGIES)
     options_list_2 = ['Yes', 'No']
-    options_list_3 = ['V-DAG', 'Inv(V-DAG)']
+    options_list_3 = ['V-DAG', 'Inv(V-DAG)', 'N-gram']
     
     # Variable to store the option user
     # selected in OptionMenu
@@ -360,48 +457,115 @@ def welcome(): # take in user_strat, game rounds
     
     # start_game_button=Button(Window,text='Start Playing!',command= lambda t= user_entry: playgame(t))
     # t is a tuple
-    start_game_button = Button(Window, text='Start Playing!', command=lambda t=(value_inside, user_entry, value_inside_2, value_inside_3): playgame(t))
+    ## Forget old data: sliding window size or half-life in rounds
+    forgetting_label=Label(Window, foreground='black',background='white', text='Forget old data:')
+    forgetting_label.place(x = 40,y = 130)
+
+    value_inside_4 = tk.StringVar(Window)
+    value_inside_4.set(FORGETTING_OPTIONS[0])
+    question_menu_4 = tk.OptionMenu(Window, value_inside_4, *FORGETTING_OPTIONS)
+    question_menu_4.place(x = 140, y = 127)
+
+    forgetting_entry = Entry(Window, width = 5)
+    forgetting_entry.insert(0, '100')
+    forgetting_entry.place(x = 280, y = 130)
+
+    start_game_button = Button(Window, text='Start Playing!', command=lambda t=(value_inside, user_entry, value_inside_2, value_inside_3, value_inside_4, forgetting_entry): playgame(t))
     start_game_button.pack()
-    start_game_button.place(x = 330, y = 130)
+    start_game_button.place(x = 340, y = 130)
     
 
+def forgetting_length(forgetting, text):
+    '''
+    returns the window size (an int) or the half-life (a float) typed in the forgetting entry, 100 if it is empty
+    raises ValueError for anything that is not a positive number
+    '''
+    length = float(text or 100)
+    if forgetting == 'Sliding window':
+        length = int(length) if np.isfinite(length) else 0
+    if not (np.isfinite(length) and length > 0):
+        raise ValueError("not a positive number: {}".format(text))
+    return length
+
+# shown under the welcome form when the forgetting entry is not a valid number
+form_error = None
+
 def playgame(t):
     '''
     This function controls the round logic, based on how many rounds you would like to play
     '''
-    nums_label=Label(Window, foreground='black',background='white', text='You will play {} games against a {} strategy'.format(t[1].get(), t[0].get())) # t[1] is a widget, t.get() is a value
-    nums_label.place(x = 40,y = 180) 
-    end_label=Label(Window, foreground='black',background='white', text='----------------------------------------------')
-    end_label.place(x = 40,y = 200) 
-    
     global total_computer_score
     global total_human_score
-    global labels
-    global labels2
+    global round_view
     global data
     global count
     global user_strat
     global enable_feedback
     global bayes
-    
+    global game_log
+    global form_error
+
+    # Check the form before touching any game state
+    forgetting = t[4].get()
+    try:
+        length = forgetting_length(forgetting, t[5].get())
+    except ValueError:
+        if form_error is None:
+            form_error = Label(Window, foreground='red', background='white')
+        form_error.configure(text='The window / half-life must be a positive number')
+        form_error.place(x = 40, y = 155)
+        return
+    if form_error is not None:
+        form_error.place_forget()
+
+    wait_for_training_data()
+
     user_strat = t[0].get()
     enable_feedback = t[2].get()
     bayes = t[3].get()
+
+    # On the worker, after any update still queued from the last game: the models take in the rounds the last game
+    # held back and are only refitted if the forgetting option changed
+    if forgetting == 'None':
+        length = None
+    inference_worker.update(lambda: start_models(forgetting, length))
     
     count = 0
-    data = []
+    data = HistoryBuffer(2)
     total_human_score = 0
     total_computer_score = 0
-    labels = []
-    labels2 = []
-    labels2.extend([nums_label, end_label])
+
+    # The round view is built by the first game and reused by every game after it
+    if round_view is None:
+        round_view = RoundView(Window)
+    round_view.hide_all()
+    round_view.game_text.set('You will play {} games against a {} strategy'.format(t[1].get(), t[0].get())) # t[1] is a widget, t.get() is a value
+    round_view.show(round_view.game_widgets)
+
+    # All games of this process are appended to the same round log
+    if game_log is None:
+        game_log = GameLog()
+    else:
+        game_log.new_game()
+    stats.game = game_log.game # round numbers start over, the stats tell the games apart by their log number
 
     ## Call display function to select a move
     display_module(t[1])
 
 
+def report_startup_time():
+    '''
+    Prints the time from the first import to the first paint of the window
+    '''
+    Window.update_idletasks()
+    print("Startup: imports {:.1f} ms, first paint {:.1f} ms".format(IMPORT_SECONDS * 1e3, (time.perf_counter() - STARTUP_START) * 1e3))
+
 if __name__ == '__main__':
     
+    ## Per-round predictions are logged instead of printed, set TQ_LOG_LEVEL=INFO to see them in the terminal
+    logging.basicConfig(level=os.environ.get('TQ_LOG_LEVEL', 'WARNING'), format='%(message)s')
+    ## Load the training data while the user fills in the welcome form
+    start_loading_training_data()
     ## Initialize a Tkinter GUI window
     Window = Tk()
     ## Set GUI window dimensions
@@ -414,10 +578,14 @@ if __name__ == '__main__':
     welcome_label=Label(Window, foreground='black',background='white', text='Welcome to Rock, Paper, Scissors! --Presented to you by 24787 TA/CA')
     welcome_label.place(x = 40,y = 60) 
     welcome_label.pack()
+    ## Start the background thread for model updates and predictions
+    inference_worker = InferenceWorker(Window)
     ## Call the welcome function
     welcome()
-    ## Clicking "Exit Program" terminates the game and exits the program
-    exitButton=Button(Window,text='Exit program',command=Window.destroy).place(x = 352, y = 500)
+    ## Clicking "Exit Program" saves the model checkpoint, terminates the game and exits the program
+    exitButton=Button(Window,text='Exit program',command=exit_program).place(x = 352, y = 500)
     # reset_button=Button(Window, foreground='black',background='white',text='Reset Game',command= lambda xx= "reset": reset_game(xx))
+    ## Measure cold start once the window has been drawn
+    Window.after_idle(report_startup_time)
     Window.mainloop()
     
@@ -0,0 +1,53 @@
+'''
+Vectorized scoring of Rock-Paper-Scissors rounds.
+
+OUTCOME[computer_move, human_move] holds the winner code of every possible round and SCORE_DELTA[winner] the points
+it gives to (human, computer), so whole arrays of rounds are scored with one fancy index and a cumulative sum.
+select_winner (TQ_opponent) and update_scores (TQ_rps_game) are thin per-round wrappers over these tables.
+
+Example (replays a recorded game):
+    python TQ_scoring.py data.npy
+'''
+
+# Import required libraries
+import sys
+import numpy as np
+from TQ_moves import TIE, round_winner, load_history
+
+# Winner code of every (computer_move, human_move) pair
+OUTCOME = round_winner(np.arange(3)[:, None], np.arange(3)[None, :]).astype(np.uint8)
+
+# Points given to (human, computer) by each winner code (tie, human, computer)
+SCORE_DELTA = np.array([[0, 0], [1, 0], [0, 1]], dtype=np.int64)
+
+def winners(computer_moves, human_moves):
+    '''
+    returns the winner codes for arrays of computer and human moves
+    '''
+    return OUTCOME[computer_moves, human_moves]
+
+def score_rounds(computer_moves, human_moves):
+    '''
+    Scores arrays of rounds along the last axis (one row per game is fine).
+    returns the winner codes and the cumulative human and computer scores after every round
+    '''
+    winner = winners(computer_moves, human_moves)
+    points = SCORE_DELTA[winner]
+    return winner, np.cumsum(points[..., 0], axis=-1), np.cumsum(points[..., 1], axis=-1)
+
+def replay_history(history):
+    '''
+    Scores a recorded history of [human_move, computer_move] rounds (e.g. data.npy) in a single vectorized call
+    '''
+    history = np.asarray(history)
+    return score_rounds(history[:, 1], history[:, 0])
+
+if __name__ == '__main__':
+    for path in sys.argv[1:] or ["data.npy"]:
+        winner, human_scores, computer_scores = replay_history(load_history(path))
+        total_human_score = int(human_scores[-1]) if len(winner) else 0
+        total_computer_score = int(computer_scores[-1]) if len(winner) else 0
+        print("{}: {} rounds".format(path, len(winner)))
+        print("Total score for Human: {}".format(total_human_score))
+        print("Total score for Computer: {}".format(total_computer_score))
+        print("Ties: {}".format(int(np.sum(winner == TIE))))
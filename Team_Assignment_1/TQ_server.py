@@ -0,0 +1,228 @@
+'''
+Asyncio game server: many concurrent Rock-Paper-Scissors games in one process.
+
+The Tk game keeps its state in module globals, so one process serves exactly one player. Here every TCP connection
+is a session with its own compact state (a HistoryBuffer of rounds, the scores and its own online model) while the
+game logic is the same as in the GUI: get_ai_move picks the computer move, select_winner scores the round and the
+selected Bayes net recommends the next move.
+
+Protocol: one JSON object per line.
+    -> {"strategy": "win-stay_lose-shift", "bayes": "V-DAG", "feedback": "Yes"}    (optional, starts a new game)
+    <- {"ok": true}
+    -> {"move": "rock"}
+    <- {"round": 1, "human_move": "rock", "computer_move": "paper", "winner": "computer",
+        "human_score": 0, "computer_score": 1, "recommended": "scissors"}
+
+Examples:
+    python TQ_server.py serve --port 8765
+    python TQ_server.py load --port 8765 --sessions 1000 --rounds 100
+    python TQ_server.py load --spawn --sessions 1000 --rounds 100      (runs the server in the same process)
+'''
+
+# Import required libraries
+import argparse
+import asyncio
+import copy
+import json
+import os
+import time
+import numpy as np
+from TQ_moves import MOVE_INDEX, WINNERS, STRATEGIES, MOVE_DTYPE, decode_move, load_history, to_triples
+from TQ_scoring import SCORE_DELTA
+from TQ_history import HistoryBuffer
+from TQ_forgetting import make_models
+from TQ_ngram import NGramModel, NGRAM_ORDER
+from TQ_opponent import get_ai_move, select_winner
+from TQ_move_source import MoveSource
+
+BAYES_OPTIONS = ['V-DAG', 'Inv(V-DAG)', 'N-gram']
+
+class Session:
+    '''
+    State of one game: the rounds played, the scores, the session's own copy of the selected model and its own stream
+    of random computer moves
+    '''
+
+    def __init__(self, base_models, move_source, user_strat='random', bayes='V-DAG', enable_feedback='Yes'):
+        if user_strat not in STRATEGIES:
+            raise ValueError("unknown strategy: {}".format(user_strat))
+        if bayes not in BAYES_OPTIONS:
+            raise ValueError("unknown Bayes net: {}".format(bayes))
+        self.user_strat = user_strat
+        self.enable_feedback = enable_feedback
+        self.move_source = move_source
+        self.model = copy.deepcopy(base_models[bayes]) # fitted once per server, copying 27 counts is cheap
+        self.data = HistoryBuffer(2)
+        self.total_human_score = 0
+        self.total_computer_score = 0
+
+    def play(self, human_move):
+        '''
+        Plays one round, the same way get_human_move does in the GUI, and returns the round summary
+        '''
+        computer_move = get_ai_move(self.data, self.user_strat, self.move_source)
+        winner = select_winner(computer_move, human_move)
+        human_points, computer_points = SCORE_DELTA[winner]
+        self.total_human_score += int(human_points)
+        self.total_computer_score += int(computer_points)
+
+        if len(self.data):
+            last_human_move, last_ai_move = self.data[-1]
+            newSamples = np.array((last_human_move, last_ai_move, computer_move), dtype=MOVE_DTYPE)
+            if self.enable_feedback == 'Yes':
+                self.model.update(newSamples)
+            elif isinstance(self.model, NGramModel):
+                self.model.update(newSamples, learn=False)
+
+        recommended_move = self.model.infer(human_move, computer_move).recommended
+        self.data.append((human_move, computer_move))
+        return {
+            'round': len(self.data),
+            'human_move': decode_move(human_move),
+            'computer_move': decode_move(computer_move),
+            'winner': WINNERS[winner],
+            'human_score': self.total_human_score,
+            'computer_score': self.total_computer_score,
+            'recommended': decode_move(recommended_move),
+        }
+
+def parse_move(move):
+    '''
+    returns the code of a move sent by a client, given as a code 0..2 or as a move name
+    raises ValueError for anything else, before the session is touched
+    '''
+    if isinstance(move, str) and move in MOVE_INDEX:
+        return MOVE_INDEX[move]
+    if isinstance(move, int) and not isinstance(move, bool) and 0 <= move <= 2:
+        return move
+    raise ValueError("unknown move: {!r}".format(move))
+
+def fit_base_models(training_data_path="training_data.npy"):
+    '''
+    Fits every model once on the historical data; sessions start from copies of these
+    '''
+    rows = np.zeros((0, 3), dtype=MOVE_DTYPE)
+    if os.path.exists(training_data_path):
+        rows = to_triples(load_history(training_data_path))
+    v_model, inv_model = make_models(rows)
+    return {'V-DAG': v_model, 'Inv(V-DAG)': inv_model, 'N-gram': NGramModel(rows, order=NGRAM_ORDER)}
+
+async def read_line(reader):
+    '''
+    returns the next request line (b'' at the end of the stream), or None for a line longer than the stream limit,
+    which is skipped up to and including its newline so that the next request is read from its start
+    '''
+    too_long = False
+    while True:
+        try:
+            line = await reader.readuntil(b'\n')
+        except asyncio.IncompleteReadError as error: # end of the stream, the last line has no newline
+            line = error.partial
+        except asyncio.LimitOverrunError as error:
+            too_long = True
+            await reader.read(error.consumed) # drop the part of the line that is already buffered
+            continue
+        return None if too_long else line
+
+async def handle_client(reader, writer, base_models, move_source):
+    session = Session(base_models, move_source)
+    try:
+        while True:
+            line = await read_line(reader)
+            if line is None:
+                writer.write(json.dumps({'error': "request line too long"}).encode() + b'\n')
+                await writer.drain()
+                continue
+            if not line:
+                break
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("a request must be a JSON object")
+                if 'move' in request:
+                    response = session.play(parse_move(request['move']))
+                else:
+                    session = Session(base_models, move_source, request.get('strategy', 'random'),
+                                      request.get('bayes', 'V-DAG'), request.get('feedback', 'Yes'))
+                    response = {'ok': True}
+            except (ValueError, TypeError) as error:
+                response = {'error': str(error)}
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+async def start_server(host, port, base_models, seed=None):
+    # Every connection gets its own stream of random moves, spawned from the server's seed
+    root = MoveSource(seed)
+    return await asyncio.start_server(lambda r, w: handle_client(r, w, base_models, root.spawn(1)[0]), host, port,
+                                      limit=2**16, backlog=4096)
+
+async def serve(host, port, training_data_path, seed=None):
+    server = await start_server(host, port, fit_base_models(training_data_path), seed)
+    print("Serving Rock-Paper-Scissors on {}:{}".format(host, port))
+    async with server:
+        await server.serve_forever()
+
+async def play_session(host, port, n_rounds, user_strat, bayes, latencies, move_source):
+    '''
+    One load-generator client: plays n_rounds random moves and records the latency of every round
+    '''
+    moves = move_source.take(n_rounds)
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(json.dumps({'strategy': user_strat, 'bayes': bayes, 'feedback': 'Yes'}).encode() + b'\n')
+    await writer.drain()
+    await reader.readline()
+    for move in moves:
+        start = time.perf_counter()
+        writer.write(json.dumps({'move': decode_move(move)}).encode() + b'\n')
+        await writer.drain()
+        await reader.readline()
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    await writer.wait_closed()
+
+async def load(host, port, n_sessions, n_rounds, user_strat, bayes, spawn, training_data_path, seed=None):
+    '''
+    Runs n_sessions concurrent games and reports round latency percentiles
+    '''
+    server_source, client_source = MoveSource(seed).spawn(2)
+    server = None
+    if spawn:
+        server = await start_server(host, port, fit_base_models(training_data_path), server_source.seed_sequence)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(play_session(host, port, n_rounds, user_strat, bayes, latencies, source)
+                           for source in client_source.spawn(n_sessions)))
+    elapsed = time.perf_counter() - start
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+
+    latencies = np.array(latencies) * 1e3
+    print("{} sessions x {} rounds against {} using {}".format(n_sessions, n_rounds, user_strat, bayes))
+    print("Round latency: p50 {:.2f} ms, p99 {:.2f} ms, max {:.2f} ms".format(
+        np.percentile(latencies, 50), np.percentile(latencies, 99), latencies.max()))
+    print("Throughput: {:.0f} rounds/s".format(len(latencies) / elapsed))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Asyncio multi-session Rock-Paper-Scissors server")
+    parser.add_argument('mode', choices=['serve', 'load'])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--training-data', default="training_data.npy")
+    parser.add_argument('--sessions', type=int, default=100, help="load: number of concurrent games")
+    parser.add_argument('--rounds', type=int, default=100, help="load: rounds per game")
+    parser.add_argument('--strategy', choices=STRATEGIES, default='win-stay_lose-shift')
+    parser.add_argument('--bayes', choices=BAYES_OPTIONS, default='V-DAG')
+    parser.add_argument('--spawn', action='store_true', help="load: run the server in this process")
+    parser.add_argument('--seed', type=int, default=None, help="seed of the random move streams")
+    args = parser.parse_args()
+
+    if args.mode == 'serve':
+        asyncio.run(serve(args.host, args.port, args.training_data, args.seed))
+    else:
+        asyncio.run(load(args.host, args.port, args.sessions, args.rounds, args.strategy, args.bayes, args.spawn,
+                         args.training_data, args.seed))
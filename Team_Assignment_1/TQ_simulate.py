@@ -0,0 +1,177 @@
+'''
+Headless, vectorized Rock-Paper-Scissors simulator.
+
+Instead of clicking through the Tk GUI one round at a time, a batch of independent games is played in lock-step:
+every round is a handful of NumPy operations over arrays of shape (n_games,), so millions of rounds finish in seconds
+on one core. The opponent follows the same strategies as get_ai_move in TQ_opponent and the human either follows the
+Bayes-net recommendation (as printed by get_real_time_bayes_net_human_move) or a scripted policy.
+
+Example:
+    python TQ_simulate.py --games 1000 --rounds 1000 --strategy win-stay_lose-shift --bayes V-DAG --feedback Yes
+'''
+
+# Import required libraries
+import argparse
+import os
+import time
+import numpy as np
+from TQ_moves import MOVE_DTYPE, TIE, HUMAN, COMPUTER, STRATEGIES, counter_move, load_history, to_triples
+from TQ_scoring import winners, score_rounds
+from TQ_bayes_net import VDAGModel, v_posterior_table
+from TQ_inv_bayes_net import InvVDAGModel
+from TQ_posterior_table import normalize
+from TQ_move_source import MoveSource
+
+HUMAN_POLICIES = ['V-DAG', 'Inv(V-DAG)', 'random']
+
+def ai_moves(user_strat, last_human_moves, last_ai_moves, random_moves):
+    '''
+    Vectorized version of get_ai_move for one round of every game, given the previous round's moves.
+    random_moves supplies the move used wherever the strategy falls back to a random choice
+    '''
+    if user_strat == 'random':
+        return random_moves
+    winner = winners(last_ai_moves, last_human_moves)
+    if user_strat == 'win-stay_lose-shift':
+        # computer won: choose the same move again
+        won_move = last_ai_moves
+    elif user_strat == 'win-shift_lose-shift':
+        # computer won: choose the opponent's previous move
+        won_move = last_human_moves
+    else:
+        raise ValueError("unknown strategy: {}".format(user_strat))
+    # computer lost: shift to the move that beats the human's last move, tie: choose a random move
+    moves = np.where(winner == HUMAN, counter_move(last_human_moves), random_moves)
+    return np.where(winner == COMPUTER, won_move, moves).astype(MOVE_DTYPE)
+
+class BayesNetPolicy:
+    '''
+    Human policy that plays the counter-move of the Bayes net's most likely next computer move, for all games at once.
+    With feedback every game keeps its own counts, exactly like feedback() in the GUI; without it the recommendation
+    table fitted on training_data is shared by all games.
+    '''
+
+    def __init__(self, bayes, n_games, training_data=None, feedback=True):
+        if bayes not in ('V-DAG', 'Inv(V-DAG)'):
+            raise ValueError("unknown Bayes net: {}".format(bayes))
+        self.bayes = bayes
+        self.feedback = feedback
+        rows = np.zeros((0, 3), dtype=MOVE_DTYPE) if training_data is None else np.asarray(training_data)
+        self.games = np.arange(n_games)
+        if bayes == 'V-DAG':
+            model = VDAGModel(rows)
+            self.counts = np.repeat(model.counts[None], n_games, axis=0)
+        else:
+            model = InvVDAGModel(rows)
+            self.label_counts = np.repeat(model.label_counts[None], n_games, axis=0)
+            self.human_counts = np.repeat(model.human_counts[None], n_games, axis=0)
+            self.computer_counts = np.repeat(model.computer_counts[None], n_games, axis=0)
+        self.model = model
+
+    def update(self, prev_human_moves, prev_ai_moves, ai_moves):
+        '''
+        Add one [prev_hm, prev_cm, cur_cm] row to every game's counts
+        '''
+        if not self.feedback:
+            return
+        if self.bayes == 'V-DAG':
+            self.counts[self.games, prev_human_moves, prev_ai_moves, ai_moves] += 1
+        else:
+            self.label_counts[self.games, ai_moves] += 1
+            self.human_counts[self.games, ai_moves, prev_human_moves] += 1
+            self.computer_counts[self.games, ai_moves, prev_ai_moves] += 1
+
+    def recommend(self, human_moves, ai_moves):
+        '''
+        returns the recommended next human move of every game given this round's moves
+        '''
+        if not self.feedback:
+            return self.model.recommend_batch(human_moves, ai_moves).astype(MOVE_DTYPE)
+        if self.bayes == 'V-DAG':
+            posterior = v_posterior_table(self.counts[self.games, human_moves, ai_moves])
+        else:
+            # Only the evidence row of each game's table is needed: P(Y) * P(human|Y) * P(computer|Y)
+            prior = normalize(self.label_counts)
+            p_human = normalize(self.human_counts)[self.games, :, human_moves]
+            p_computer = normalize(self.computer_counts)[self.games, :, ai_moves]
+            posterior = normalize(prior * p_human * p_computer)
+        return counter_move(np.argmax(posterior, axis=-1)).astype(MOVE_DTYPE)
+
+def simulate(n_games, n_rounds, user_strat='random', bayes='V-DAG', feedback=True, training_data=None, seed=None):
+    '''
+    Plays n_games independent games of n_rounds rounds each.
+    bayes is 'V-DAG', 'Inv(V-DAG)', 'random', or a scripted policy called as
+    bayes(round_number, human_moves, computer_moves, rng) with the (n_games, round_number) history so far.
+    returns a dict with the (n_games, n_rounds) arrays human_moves, computer_moves and winners, and the final scores
+    The computer's random moves and the human's come from two independent streams spawned from seed, so a run is
+    replayed bit-for-bit with the same seed
+    '''
+    if n_rounds < 1:
+        raise ValueError("n_rounds must be at least 1")
+    computer_seed, human_seed = np.random.SeedSequence(seed).spawn(2)
+    computer_source = MoveSource(computer_seed)
+    rng = np.random.default_rng(human_seed)
+    human_moves = np.empty((n_games, n_rounds), dtype=MOVE_DTYPE)
+    computer_moves = np.empty((n_games, n_rounds), dtype=MOVE_DTYPE)
+    policy = BayesNetPolicy(bayes, n_games, training_data, feedback) if bayes in ('V-DAG', 'Inv(V-DAG)') else None
+
+    for r in range(n_rounds):
+        random_moves = computer_source.take(n_games)
+        if r == 0:
+            # no previous data: both players choose a random move
+            computer_moves[:, r] = random_moves
+            human_moves[:, r] = rng.integers(0, 3, size=n_games, dtype=MOVE_DTYPE)
+            continue
+        computer_moves[:, r] = ai_moves(user_strat, human_moves[:, r - 1], computer_moves[:, r - 1], random_moves)
+        if policy is not None:
+            if r >= 2:
+                policy.update(human_moves[:, r - 2], computer_moves[:, r - 2], computer_moves[:, r - 1])
+            human_moves[:, r] = policy.recommend(human_moves[:, r - 1], computer_moves[:, r - 1])
+        elif bayes == 'random':
+            human_moves[:, r] = rng.integers(0, 3, size=n_games, dtype=MOVE_DTYPE)
+        else:
+            human_moves[:, r] = bayes(r, human_moves[:, :r], computer_moves[:, :r], rng)
+
+    winner, human_scores, computer_scores = score_rounds(computer_moves, human_moves)
+    return {
+        'human_moves': human_moves,
+        'computer_moves': computer_moves,
+        'winners': winner,
+        'total_human_score': human_scores[:, -1],
+        'total_computer_score': computer_scores[:, -1],
+    }
+
+def summarize(result):
+    '''
+    returns the fraction of rounds won by the human, won by the computer and tied
+    '''
+    winner = result['winners']
+    return {
+        'human': float(np.mean(winner == HUMAN)),
+        'computer': float(np.mean(winner == COMPUTER)),
+        'tie': float(np.mean(winner == TIE)),
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless Rock-Paper-Scissors simulation")
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=1000)
+    parser.add_argument('--strategy', choices=STRATEGIES, default='random')
+    parser.add_argument('--bayes', choices=HUMAN_POLICIES, default='V-DAG')
+    parser.add_argument('--feedback', choices=['Yes', 'No'], default='Yes')
+    parser.add_argument('--training-data', default="training_data.npy")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    training_data = None
+    if os.path.exists(args.training_data):
+        training_data = to_triples(load_history(args.training_data))
+
+    start = time.perf_counter()
+    result = simulate(args.games, args.rounds, args.strategy, args.bayes, args.feedback == 'Yes', training_data, args.seed)
+    elapsed = time.perf_counter() - start
+
+    rates = summarize(result)
+    print("{} games x {} rounds against {} using {} (feedback: {})".format(args.games, args.rounds, args.strategy, args.bayes, args.feedback))
+    print("Human win rate: {:.4f}, computer win rate: {:.4f}, tie rate: {:.4f}".format(rates['human'], rates['computer'], rates['tie']))
+    print("Simulated {} rounds in {:.2f}s".format(args.games * args.rounds, elapsed))
@@ -0,0 +1,129 @@
+'''
+Streaming fit for histories larger than memory.
+
+load_history() reads a whole history and to_triples() then builds a shifted copy of it before a model sees any row.
+Here the history is memory-mapped (np.load with mmap_mode='r', or the round log's memmap) and read in fixed-size
+chunks. The [prev_hm, prev_cm, cur_cm] triples of a chunk are built in one preallocated block, using the last round of
+the previous chunk for the first triple, and handed to model.partial_fit(), so peak memory depends on the chunk size
+and not on the length of the history.
+
+Legacy histories holding pickled move strings cannot be memory-mapped; they are loaded with load_history() and then
+chunked the same way.
+
+Example (fits all three models and reports the peak memory used while fitting):
+    python TQ_stream.py training_data.npy --chunk-rows 1000000
+'''
+
+# Import required libraries
+import argparse
+import time
+import tracemalloc
+import numpy as np
+from TQ_moves import MOVE_DTYPE, encode_moves, load_history
+from TQ_game_log import log_triples
+from TQ_bayes_net import VDAGModel
+from TQ_inv_bayes_net import InvVDAGModel
+from TQ_ngram import NGramModel
+
+CHUNK_ROWS = 1 << 20
+
+def iter_history_chunks(path, chunk_rows=CHUNK_ROWS):
+    '''
+    Yields the [human_move, computer_move] rounds of a history file as uint8 chunks of at most chunk_rows rows
+    '''
+    try:
+        history = np.load(path, mmap_mode='r')
+    except ValueError:
+        history = load_history(path) # pickled legacy file, read in full
+    history = history.reshape(-1, 2)
+    for start in range(0, len(history), chunk_rows):
+        yield encode_moves(history[start:start + chunk_rows])
+
+def iter_triples(chunks):
+    '''
+    Yields the [prev_hm, prev_cm, cur_cm] triples of a stream of round chunks, carrying the last round of every chunk
+    over to the next one so that no triple is lost at a chunk boundary
+    '''
+    last = None
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        n = len(chunk) if last is not None else len(chunk) - 1
+        triples = np.empty((n, 3), dtype=MOVE_DTYPE)
+        if last is not None:
+            triples[0, :2] = last
+            triples[1:, :2] = chunk[:-1]
+        else:
+            triples[:, :2] = chunk[:-1]
+        triples[:, 2] = chunk[len(chunk) - n:, 1]
+        last = chunk[-1].copy()
+        if n:
+            yield triples
+
+def iter_log_triples(log, start=0, chunk_rows=CHUNK_ROWS):
+    '''
+    Yields the triples of a round log (see TQ_game_log) from record start on, chunk_rows records at a time.
+    Triples never span two games; the record before a chunk is used for the chunk's first triple
+    '''
+    for first in range(start, len(log), chunk_rows):
+        triples = log_triples(log[:first + chunk_rows], first)
+        if len(triples):
+            yield triples
+
+def iter_log_games(log, start=0, chunk_rows=CHUNK_ROWS):
+    '''
+    Yields (new_game, triples) for the round log from record start on, one array per game (a game that spans several
+    chunks comes in several arrays, only the first one with new_game True). Use with fit_games()
+    '''
+    for first in range(start, len(log), chunk_rows):
+        block = log[max(first - 1, 0):first + chunk_rows] # the record before the chunk is the previous round
+        game = block['game']
+        edges = [0] + (np.flatnonzero(game[:-1] != game[1:]) + 1).tolist() + [len(block)]
+        for i in range(len(edges) - 1):
+            records = block[edges[i]:edges[i + 1]]
+            triples = np.stack((records['human'][:-1], records['computer'][:-1], records['computer'][1:]),
+                               axis=1).astype(MOVE_DTYPE)
+            yield i > 0 or first == start, triples
+
+def fit_games(model, game_chunks):
+    '''
+    Like stream_fit for (new_game, triples) chunks: the model is told about every new game (see
+    PosteriorTableModel.new_game), so that the N-gram model never counts a context spanning two games
+    '''
+    for new_game, triples in game_chunks:
+        if new_game:
+            model.new_game()
+        if len(triples):
+            model.partial_fit(triples)
+    model.new_game()
+    return model
+
+def stream_fit(model, triple_chunks):
+    '''
+    Accumulates the statistics of a model chunk by chunk and returns it
+    '''
+    for triples in triple_chunks:
+        model.partial_fit(triples)
+    return model
+
+def fit_history(model, path, chunk_rows=CHUNK_ROWS):
+    '''
+    Fits a model on a history file without loading the whole file
+    '''
+    return stream_fit(model, iter_triples(iter_history_chunks(path, chunk_rows)))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Chunked streaming fit of the opponent models")
+    parser.add_argument('history', nargs='?', default="training_data.npy")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--order', type=int, default=3, help="order of the N-gram model")
+    args = parser.parse_args()
+
+    for name, model in (('V-DAG', VDAGModel()), ('Inv(V-DAG)', InvVDAGModel()), ('N-gram', NGramModel(order=args.order))):
+        tracemalloc.start()
+        start = time.perf_counter()
+        fit_history(model, args.history, args.chunk_rows)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print("{:<11} fitted in {:.2f}s, peak memory {:.1f} MB".format(name, elapsed, peak / 2**20))
@@ -0,0 +1,111 @@
+'''
+Tournament runner: every computer strategy against every recommender, with and without real-time feedback, over
+many seeds.
+
+Each (strategy, Bayes net, feedback, seed) cell is one batch of headless games (see TQ_simulate). The grid is fanned
+out over a ProcessPoolExecutor using all cores and results are printed as they come in. At the end the per-game human
+win rates of every (strategy, Bayes net, feedback) configuration are aggregated into a mean with a 95% confidence
+interval.
+
+Example:
+    python TQ_tournament.py --seeds 20 --games 200 --rounds 500 --output tournament.csv
+'''
+
+# Import required libraries
+import argparse
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from TQ_moves import HUMAN, COMPUTER, STRATEGIES, load_history, to_triples
+from TQ_simulate import simulate
+
+RECOMMENDERS = ['V-DAG', 'Inv(V-DAG)']
+FEEDBACK_OPTIONS = ['Yes', 'No']
+
+def run_cell(user_strat, bayes, enable_feedback, seed, n_games, n_rounds, training_data):
+    '''
+    Plays one cell of the grid and returns the per-game human and computer win rates
+    '''
+    result = simulate(n_games, n_rounds, user_strat, bayes, enable_feedback == 'Yes', training_data, seed)
+    winners = result['winners']
+    return {
+        'strategy': user_strat,
+        'bayes': bayes,
+        'feedback': enable_feedback,
+        'seed': seed,
+        'human_win_rates': (winners == HUMAN).mean(axis=1),
+        'computer_win_rates': (winners == COMPUTER).mean(axis=1),
+    }
+
+def confidence_interval(values, z=1.96):
+    '''
+    returns the mean of values and the half-width of its normal-approximation confidence interval
+    '''
+    values = np.asarray(values, dtype=float)
+    if len(values) < 2:
+        return float(values.mean()), float('nan')
+    return float(values.mean()), float(z * values.std(ddof=1) / np.sqrt(len(values)))
+
+def run_tournament(seeds, n_games, n_rounds, training_data=None, max_workers=None,
+                   strategies=STRATEGIES, recommenders=RECOMMENDERS, feedback_options=FEEDBACK_OPTIONS):
+    '''
+    Runs the whole grid and returns one aggregated row per (strategy, Bayes net, feedback) configuration
+    '''
+    grid = list(itertools.product(strategies, recommenders, feedback_options, range(seeds)))
+    human_rates = {}
+    computer_rates = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        futures = [pool.submit(run_cell, *cell, n_games, n_rounds, training_data) for cell in grid]
+        for done, future in enumerate(as_completed(futures), 1):
+            cell = future.result()
+            key = (cell['strategy'], cell['bayes'], cell['feedback'])
+            human_rates.setdefault(key, []).append(cell['human_win_rates'])
+            computer_rates.setdefault(key, []).append(cell['computer_win_rates'])
+            print("[{}/{} {:.1f}s] {} vs {} (feedback: {}, seed {}): human win rate {:.4f}".format(
+                done, len(grid), time.perf_counter() - start, cell['bayes'], cell['strategy'], cell['feedback'],
+                cell['seed'], cell['human_win_rates'].mean()), flush=True)
+
+    table = []
+    for key in itertools.product(strategies, recommenders, feedback_options):
+        human_mean, human_ci = confidence_interval(np.concatenate(human_rates[key]))
+        computer_mean, computer_ci = confidence_interval(np.concatenate(computer_rates[key]))
+        table.append({
+            'strategy': key[0], 'bayes': key[1], 'feedback': key[2], 'games': seeds * n_games,
+            'human_win_rate': human_mean, 'human_ci95': human_ci,
+            'computer_win_rate': computer_mean, 'computer_ci95': computer_ci,
+        })
+    return table
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Strategy x recommender tournament over many seeds")
+    parser.add_argument('--seeds', type=int, default=10)
+    parser.add_argument('--games', type=int, default=100, help="games per seed")
+    parser.add_argument('--rounds', type=int, default=500, help="rounds per game")
+    parser.add_argument('--workers', type=int, default=None, help="defaults to all cores")
+    parser.add_argument('--training-data', default="training_data.npy")
+    parser.add_argument('--output', default=None, help="optional CSV file for the aggregated table")
+    args = parser.parse_args()
+
+    training_data = None
+    if os.path.exists(args.training_data):
+        training_data = to_triples(load_history(args.training_data))
+
+    table = run_tournament(args.seeds, args.games, args.rounds, training_data, args.workers)
+
+    print()
+    print("{:<22} {:<11} {:<9} {:>22} {:>22}".format('strategy', 'bayes', 'feedback', 'human win rate', 'computer win rate'))
+    for row in table:
+        print("{:<22} {:<11} {:<9} {:>13.4f} +/- {:.4f} {:>13.4f} +/- {:.4f}".format(
+            row['strategy'], row['bayes'], row['feedback'], row['human_win_rate'], row['human_ci95'],
+            row['computer_win_rate'], row['computer_ci95']))
+
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(table[0]))
+            writer.writeheader()
+            writer.writerows(table)
+        print("Results written to {}".format(args.output))
@@ -0,0 +1,97 @@
+'''
+Background inference worker for the Tk GUI.
+
+Model updates and predictions run on a single worker thread so the Tk main loop never blocks on fitting, and the
+results are handed back to the GUI thread by a poll scheduled with Window.after (Tk widgets must only be touched from
+the thread running mainloop).
+
+Coalescing policy for clicks that arrive while the worker is busy:
+    - updates (e.g. feedback() rows) are never dropped and run in the order they were submitted
+    - only the most recent prediction request is kept: a request that has not started yet is replaced by a newer one,
+      and the result of a request that was superseded while running is discarded
+    - every request runs after all updates submitted before it, so a prediction always sees the data of its own round
+'''
+
+# Import required libraries
+import queue
+import threading
+import traceback
+
+# returned by _call() for a job that raised
+_FAILED = object()
+
+class InferenceWorker:
+
+    def __init__(self, window, poll_ms=20):
+        self.window = window
+        self.poll_ms = poll_ms
+        self._lock = threading.Condition()
+        self._updates = []
+        self._request = None        # (sequence number, job, callback) of the latest pending prediction
+        self._latest = 0            # sequence number of the latest submitted prediction
+        self._results = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.window.after(self.poll_ms, self._poll)
+
+    def update(self, job):
+        '''
+        Queues job() to run on the worker thread; updates are never coalesced
+        '''
+        with self._lock:
+            self._updates.append(job)
+            self._lock.notify()
+
+    def request(self, job, callback):
+        '''
+        Queues job() to run on the worker thread and callback(result) to run on the GUI thread once it is done.
+        Replaces any request that has not started yet
+        '''
+        with self._lock:
+            self._latest += 1
+            self._request = (self._latest, job, callback)
+            self._lock.notify()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._updates and self._request is None:
+                    self._lock.wait()
+                updates, self._updates = self._updates, []
+                request = None
+                if not updates:
+                    # Only run the request once every update submitted before it has been applied
+                    request, self._request = self._request, None
+            for job in updates:
+                self._call(job)
+            if request is not None:
+                sequence, job, callback = request
+                result = self._call(job)
+                if result is not _FAILED: # the callback only ever sees real results
+                    self._results.put((sequence, callback, result))
+
+    def _call(self, job):
+        # A failing job is reported but must not kill the worker
+        try:
+            return job()
+        except Exception:
+            traceback.print_exc()
+            return _FAILED
+
+    def _poll(self):
+        '''
+        Runs on the GUI thread: delivers finished results that have not been superseded.
+        A failing callback is reported and the poll is always rescheduled, so later results still get delivered
+        '''
+        try:
+            while True:
+                sequence, callback, result = self._results.get_nowait()
+                if sequence == self._latest:
+                    try:
+                        callback(result)
+                    except Exception:
+                        traceback.print_exc()
+        except queue.Empty:
+            pass
+        finally:
+            self.window.after(self.poll_ms, self._poll)
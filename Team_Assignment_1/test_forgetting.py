@@ -0,0 +1,53 @@
+'''
+Chunked fits of the forgetting models (see TQ_forgetting) must give the same counts as fit() on the whole history.
+
+Run with:
+    python -m pytest -q test_forgetting.py
+'''
+
+# Import required libraries
+import numpy as np
+import pytest
+from TQ_forgetting import DecayedVDAGModel, DecayedInvVDAGModel, WindowedVDAGModel, WindowedInvVDAGModel
+from TQ_stream import stream_fit
+
+ROWS = np.random.default_rng(0).integers(0, 3, size=(1000, 3))
+
+def chunks(rows, size):
+    return [rows[start:start + size] for start in range(0, len(rows), size)]
+
+def assert_same_counts(chunked, fitted):
+    for chunk_counts, fit_counts in zip(chunked._count_arrays(), fitted._count_arrays()):
+        np.testing.assert_allclose(chunk_counts, fit_counts, rtol=1e-9)
+    np.testing.assert_allclose(chunked.posterior_table(), fitted.posterior_table())
+
+@pytest.mark.parametrize('model_class', [DecayedVDAGModel, DecayedInvVDAGModel])
+@pytest.mark.parametrize('chunk_size', [1, 7, 100, 1000])
+def test_decayed_partial_fit_matches_fit(model_class, chunk_size):
+    chunked = stream_fit(model_class(half_life=50), chunks(ROWS, chunk_size))
+    fitted = model_class(ROWS, half_life=50)
+    assert_same_counts(chunked, fitted)
+
+    # single-row updates keep going from the chunked state
+    for row in ROWS[:10]:
+        chunked.update(row)
+        fitted.update(row)
+    assert_same_counts(chunked, fitted)
+
+@pytest.mark.parametrize('model_class', [WindowedVDAGModel, WindowedInvVDAGModel])
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 100, 1000])
+def test_windowed_partial_fit_matches_fit(model_class, chunk_size):
+    chunked = stream_fit(model_class(window=64), chunks(ROWS, chunk_size))
+    fitted = model_class(ROWS, window=64)
+    assert_same_counts(chunked, fitted)
+
+    # the ring buffer holds the same rows, so later updates drop the same ones
+    for row in ROWS[:100]:
+        chunked.update(row)
+        fitted.update(row)
+    assert_same_counts(chunked, fitted)
+
+def test_windowed_partial_fit_before_the_window_fills():
+    chunked = stream_fit(WindowedVDAGModel(window=64), chunks(ROWS[:40], 15))
+    assert_same_counts(chunked, WindowedVDAGModel(ROWS[:40], window=64))
+    assert chunked.n_recent == 40